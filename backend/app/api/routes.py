@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import hashlib
 import logging
-import re
-from io import BytesIO
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
 
 from fastapi import APIRouter, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
 
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.config import settings
 from app.core.session import SessionStore
 from app.models.schemas import (
@@ -33,6 +36,7 @@ from app.services.gemini_service import GeminiService
 from app.services.local_ai_service import LocalAIService
 from app.services.ollama_service import OllamaService
 from app.services.pipeline_utils import (
+    build_chunk_index,
     build_query_from_summary,
     clean_transcript_text,
     select_top_chunks_for_query,
@@ -56,6 +60,8 @@ ollama_service = OllamaService(
 session_store = SessionStore(ttl_minutes=settings.session_ttl_minutes)
 auth_service = AuthService()
 _gemini_service: GeminiService | None = None
+_gemini_breaker = CircuitBreaker()
+_ollama_breaker = CircuitBreaker()
 
 
 def get_gemini_service() -> GeminiService:
@@ -70,26 +76,109 @@ def get_gemini_service() -> GeminiService:
     return _gemini_service
 
 
-def _is_recoverable_http_error(exc: HTTPException) -> bool:
-    return exc.status_code in {401, 403, 429, 500, 502, 503, 504}
+@lru_cache(maxsize=64)
+def _retrieval_chunks_for(transcript: str) -> tuple[str, ...]:
+    # Callers always pass transcripts that went through clean_transcript_text.
+    return tuple(split_into_chunks(transcript, max_chars=1400, overlap_chars=120, max_chunks=24, already_clean=True))
+
+
+@lru_cache(maxsize=64)
+def _retrieval_index_for(transcript: str) -> tuple:
+    return tuple(build_chunk_index(list(_retrieval_chunks_for(transcript))))
+
 
+_inflight_summaries: dict[str, asyncio.Future] = {}
+_inflight_mcqs: dict[tuple[str, str], asyncio.Future] = {}
 
-def _run_with_fallback_chain(operation: str, gemini_call, ollama_call, local_call):
+# Bulkheads: bound concurrency per provider so one slow dependency cannot
+# monopolize the shared thread pool and starve the others.
+_gemini_sem = asyncio.Semaphore(20)
+_ollama_sem = asyncio.Semaphore(10)
+_local_sem = asyncio.Semaphore(4)
+
+_GEMINI_TIMEOUT_SECONDS = 120.0
+_OLLAMA_TIMEOUT_SECONDS = 180.0
+_SEM_ACQUIRE_TIMEOUT_SECONDS = 1.0
+
+
+async def _try_acquire(semaphore: asyncio.Semaphore) -> bool:
     try:
-        return gemini_call()
-    except HTTPException as exc:
-        if _is_recoverable_http_error(exc):
-            logger.warning("%s unavailable (%s). Trying local model fallback.", operation, exc.detail)
-        else:
-            raise
-    except Exception as exc:
-        logger.warning("%s failed with Gemini (%s). Trying local model fallback.", operation, exc)
+        await asyncio.wait_for(semaphore.acquire(), timeout=_SEM_ACQUIRE_TIMEOUT_SECONDS)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
 
+async def _coalesce_inflight(inflight: dict, key: Any, factory: Callable[[], Awaitable]):
+    """Share one in-flight provider call among concurrent identical requests."""
+    existing = inflight.get(key)
+    if existing is not None:
+        # Shield so a cancelled follower does not cancel the shared future.
+        return await asyncio.shield(existing)
+
+    future: asyncio.Future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
     try:
-        return ollama_call()
-    except Exception as exc:
-        logger.warning("%s failed with Ollama (%s). Using built-in offline fallback.", operation, exc)
-        return local_call()
+        result = await factory()
+        future.set_result(result)
+        return result
+    except BaseException as exc:
+        future.set_exception(exc)
+        future.exception()  # Mark retrieved in case no follower is waiting.
+        raise
+    finally:
+        inflight.pop(key, None)
+
+
+def _is_recoverable_http_error(exc: HTTPException) -> bool:
+    return exc.status_code in {401, 403, 429, 500, 502, 503, 504}
+
+
+async def _run_with_fallback_chain(operation: str, gemini_call, ollama_call, local_call):
+    if not _gemini_breaker.allow():
+        logger.warning("%s skipped Gemini (circuit open). Trying local model fallback.", operation)
+    elif not await _try_acquire(_gemini_sem):
+        logger.warning("%s skipped Gemini (bulkhead full). Trying local model fallback.", operation)
+    else:
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(gemini_call), timeout=_GEMINI_TIMEOUT_SECONDS)
+            _gemini_breaker.record_success()
+            return result
+        except HTTPException as exc:
+            if _is_recoverable_http_error(exc):
+                _gemini_breaker.record_failure()
+                logger.warning("%s unavailable (%s). Trying local model fallback.", operation, exc.detail)
+            else:
+                raise
+        except asyncio.TimeoutError:
+            _gemini_breaker.record_failure()
+            logger.warning("%s timed out with Gemini. Trying local model fallback.", operation)
+        except Exception as exc:
+            _gemini_breaker.record_failure()
+            logger.warning("%s failed with Gemini (%s). Trying local model fallback.", operation, exc)
+        finally:
+            _gemini_sem.release()
+
+    if not _ollama_breaker.allow():
+        logger.warning("%s skipped Ollama (circuit open). Using built-in offline fallback.", operation)
+    elif not await _try_acquire(_ollama_sem):
+        logger.warning("%s skipped Ollama (bulkhead full). Using built-in offline fallback.", operation)
+    else:
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(ollama_call), timeout=_OLLAMA_TIMEOUT_SECONDS)
+            _ollama_breaker.record_success()
+            return result
+        except asyncio.TimeoutError:
+            _ollama_breaker.record_failure()
+            logger.warning("%s timed out with Ollama. Using built-in offline fallback.", operation)
+        except Exception as exc:
+            _ollama_breaker.record_failure()
+            logger.warning("%s failed with Ollama (%s). Using built-in offline fallback.", operation, exc)
+        finally:
+            _ollama_sem.release()
+
+    async with _local_sem:
+        return await asyncio.to_thread(local_call)
 
 
 def _map_service_error(exc: Exception) -> HTTPException:
@@ -124,7 +213,9 @@ async def health() -> dict[str, str]:
 
 @router.post("/auth/register", response_model=AuthResponse)
 async def auth_register(payload: RegisterRequest) -> AuthResponse:
-    user = auth_service.register_user(
+    # Password hashing is CPU-bound; keep it off the event loop.
+    user = await asyncio.to_thread(
+        auth_service.register_user,
         name=payload.name,
         email=payload.email,
         password=payload.password,
@@ -137,7 +228,8 @@ async def auth_register(payload: RegisterRequest) -> AuthResponse:
 
 @router.post("/auth/login", response_model=AuthResponse)
 async def auth_login(payload: LoginRequest) -> AuthResponse:
-    user = auth_service.authenticate_user(
+    user = await asyncio.to_thread(
+        auth_service.authenticate_user,
         email=payload.email,
         password=payload.password,
     )
@@ -191,12 +283,18 @@ async def video_meta(payload: ExtractCaptionsRequest) -> VideoMetaResponse:
 async def summarize(payload: SummarizeRequest) -> SummarizeResponse:
     cleaned_transcript = clean_transcript_text(payload.transcript)
 
+    transcript_key = hashlib.blake2b(cleaned_transcript.encode("utf-8"), digest_size=16).hexdigest()
+
     try:
-        summary = _run_with_fallback_chain(
-            operation="summarize",
-            gemini_call=lambda: get_gemini_service().summarize(cleaned_transcript),
-            ollama_call=lambda: ollama_service.summarize(cleaned_transcript),
-            local_call=lambda: local_ai_service.summarize(cleaned_transcript),
+        summary = await _coalesce_inflight(
+            _inflight_summaries,
+            transcript_key,
+            lambda: _run_with_fallback_chain(
+                operation="summarize",
+                gemini_call=lambda: get_gemini_service().summarize(cleaned_transcript),
+                ollama_call=lambda: ollama_service.summarize(cleaned_transcript),
+                local_call=lambda: local_ai_service.summarize(cleaned_transcript),
+            ),
         )
     except HTTPException:
         raise
@@ -207,10 +305,9 @@ async def summarize(payload: SummarizeRequest) -> SummarizeResponse:
     session_id = session_store.ensure(payload.session_id)
     session_store.set_transcript(session_id, cleaned_transcript)
     session_store.set_summary(session_id, summary.model_dump())
-    session_store.set_retrieval_chunks(
-        session_id,
-        split_into_chunks(cleaned_transcript, max_chars=1400, overlap_chars=120, max_chunks=24),
-    )
+    retrieval_chunks = list(_retrieval_chunks_for(cleaned_transcript))
+    session_store.set_retrieval_chunks(session_id, retrieval_chunks)
+    session_store.set_retrieval_index(session_id, list(_retrieval_index_for(cleaned_transcript)))
 
     return SummarizeResponse(session_id=session_id, summary=summary)
 
@@ -223,7 +320,8 @@ async def chat(payload: ChatRequest) -> ChatResponse:
     if not summary:
         cached_summary = session_store.get_summary(session_id)
         if cached_summary:
-            summary = StructuredSummary(**cached_summary)
+            # Cached dicts came from model_dump(); skip re-validation.
+            summary = StructuredSummary.model_construct(**cached_summary)
 
     if not summary:
         raise HTTPException(
@@ -232,33 +330,41 @@ async def chat(payload: ChatRequest) -> ChatResponse:
         )
 
     retrieval_chunks = session_store.get_retrieval_chunks(session_id)
+    retrieval_index = session_store.get_retrieval_index(session_id)
     if not retrieval_chunks:
         session = session_store.get(session_id) or {}
-        retrieval_chunks = split_into_chunks(session.get("transcript", ""), max_chars=1400, overlap_chars=120, max_chunks=24)
+        transcript = session.get("transcript", "")
+        retrieval_chunks = list(_retrieval_chunks_for(transcript))
+        retrieval_index = list(_retrieval_index_for(transcript))
         if retrieval_chunks:
             session_store.set_retrieval_chunks(session_id, retrieval_chunks)
+            session_store.set_retrieval_index(session_id, retrieval_index)
 
-    context_chunks = select_top_chunks_for_query(payload.message, retrieval_chunks, top_k=4)
+    context_chunks = select_top_chunks_for_query(
+        payload.message, retrieval_chunks, top_k=4, chunk_index=retrieval_index
+    )
+    # Serialize the history once; every provider consumes the same dicts.
+    history = [item.model_dump() for item in payload.history]
 
     try:
-        answer = _run_with_fallback_chain(
+        answer = await _run_with_fallback_chain(
             operation="chat",
             gemini_call=lambda: get_gemini_service().chat(
                 message=payload.message,
                 summary=summary,
-                history=payload.history,
+                history=history,
                 context_chunks=context_chunks,
             ),
             ollama_call=lambda: ollama_service.chat(
                 message=payload.message,
                 summary=summary,
-                history=payload.history,
+                history=history,
                 context_chunks=context_chunks,
             ),
             local_call=lambda: local_ai_service.chat(
                 message=payload.message,
                 summary=summary,
-                history=payload.history,
+                history=history,
                 context_chunks=context_chunks,
             ),
         )
@@ -268,29 +374,61 @@ async def chat(payload: ChatRequest) -> ChatResponse:
         logger.exception("Chat generation failed: %s", exc)
         raise _map_service_error(exc) from exc
 
-    session_store.set_summary(session_id, summary.model_dump())
+    if payload.summary:
+        # Only persist when the caller supplied a new summary; the cached one is already stored.
+        session_store.set_summary(session_id, summary.model_dump())
     session_store.append_chat(session_id, "user", payload.message)
     session_store.append_chat(session_id, "assistant", answer)
 
     return ChatResponse(session_id=session_id, answer=answer)
 
 
+_ALLOWED_IMAGE_MIME_TYPES = {"image/png", "image/jpeg", "image/jpg", "image/webp", "image/gif"}
+
+_MAX_IMAGE_BYTES = 8 * 1024 * 1024
+# base64 expands 3 bytes to 4 chars, so anything longer cannot decode under the limit.
+_MAX_IMAGE_B64_CHARS = (_MAX_IMAGE_BYTES + 2) * 4 // 3
+
+
+def _looks_like_image(prefix: bytes) -> bool:
+    return (
+        prefix.startswith(b"\x89PNG")
+        or prefix.startswith(b"\xff\xd8\xff")
+        or (prefix.startswith(b"RIFF") and prefix[8:12] == b"WEBP")
+        or prefix.startswith(b"GIF8")
+    )
+
+
 def _decode_image_data_url(data_url: str) -> tuple[bytes, str]:
-    pattern = r"^data:(image/[a-zA-Z0-9.+-]+);base64,(.+)$"
-    match = re.match(pattern, data_url.strip(), flags=re.DOTALL)
-    if not match:
+    value = data_url.strip()
+    if not value.startswith("data:image/"):
         raise HTTPException(status_code=400, detail="Invalid image format. Expected base64 data URL.")
 
-    mime_type = match.group(1).lower().strip()
-    payload = match.group(2).strip()
+    header, separator, payload = value.partition(";base64,")
+    if not separator or not payload:
+        raise HTTPException(status_code=400, detail="Invalid image format. Expected base64 data URL.")
+
+    mime_type = header[5:].lower().strip()
+    if mime_type not in _ALLOWED_IMAGE_MIME_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported image type. Use PNG, JPEG, WEBP, or GIF.")
+
+    payload = payload.strip()
+    if len(payload) > _MAX_IMAGE_B64_CHARS:
+        # Reject before decoding so oversized payloads never allocate decoded bytes.
+        raise HTTPException(status_code=413, detail="Image is too large. Maximum allowed size is 8 MB.")
 
     try:
+        # Peek at the first 18 decoded bytes to drop non-image payloads cheaply.
+        if len(payload) >= 24 and not _looks_like_image(base64.b64decode(payload[:24], validate=True)):
+            raise HTTPException(status_code=400, detail="Payload is not a recognized image format.")
         image_bytes = base64.b64decode(payload, validate=True)
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=400, detail="Could not decode image payload.") from exc
 
-    if len(image_bytes) > 8 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Image is too large. Maximum allowed size is 8 MB.")
+    if len(image_bytes) > _MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large. Maximum allowed size is 8 MB.")
 
     return image_bytes, mime_type
 
@@ -303,26 +441,28 @@ async def solver_chat(payload: SolverChatRequest) -> SolverChatResponse:
     if payload.image_data_url:
         image_bytes, image_mime_type = _decode_image_data_url(payload.image_data_url)
 
+    history = [item.model_dump() for item in payload.history]
+
     try:
-        answer = _run_with_fallback_chain(
+        answer = await _run_with_fallback_chain(
             operation="solver_chat",
             gemini_call=lambda: get_gemini_service().solver_chat(
                 message=payload.message,
-                history=payload.history,
+                history=history,
                 image_bytes=image_bytes,
                 image_mime_type=image_mime_type,
                 image_data_url=payload.image_data_url,
             ),
             ollama_call=lambda: ollama_service.solver_chat(
                 message=payload.message,
-                history=payload.history,
+                history=history,
                 image_bytes=image_bytes,
                 image_mime_type=image_mime_type,
                 image_data_url=payload.image_data_url,
             ),
             local_call=lambda: local_ai_service.solver_chat(
                 message=payload.message,
-                history=payload.history,
+                history=history,
                 image_bytes=image_bytes,
                 image_mime_type=image_mime_type,
                 image_data_url=payload.image_data_url,
@@ -345,7 +485,8 @@ async def generate_mcq(payload: MCQRequest) -> MCQResponse:
     if not summary:
         cached_summary = session_store.get_summary(session_id)
         if cached_summary:
-            summary = StructuredSummary(**cached_summary)
+            # Cached dicts came from model_dump(); skip re-validation.
+            summary = StructuredSummary.model_construct(**cached_summary)
 
     if not summary:
         raise HTTPException(
@@ -354,21 +495,33 @@ async def generate_mcq(payload: MCQRequest) -> MCQResponse:
         )
 
     retrieval_chunks = session_store.get_retrieval_chunks(session_id)
+    retrieval_index = session_store.get_retrieval_index(session_id)
     if not retrieval_chunks:
         session = session_store.get(session_id) or {}
-        retrieval_chunks = split_into_chunks(session.get("transcript", ""), max_chars=1400, overlap_chars=120, max_chunks=24)
+        transcript = session.get("transcript", "")
+        retrieval_chunks = list(_retrieval_chunks_for(transcript))
+        retrieval_index = list(_retrieval_index_for(transcript))
         if retrieval_chunks:
             session_store.set_retrieval_chunks(session_id, retrieval_chunks)
+            session_store.set_retrieval_index(session_id, retrieval_index)
 
     summary_query = build_query_from_summary(summary)
-    context_chunks = select_top_chunks_for_query(summary_query, retrieval_chunks, top_k=8)
+    context_chunks = select_top_chunks_for_query(
+        summary_query, retrieval_chunks, top_k=8, chunk_index=retrieval_index
+    )
+
+    summary_key = hashlib.blake2b(summary.model_dump_json().encode("utf-8"), digest_size=16).hexdigest()
 
     try:
-        mcqs = _run_with_fallback_chain(
-            operation="mcq",
-            gemini_call=lambda: get_gemini_service().generate_mcqs(summary, context_chunks=context_chunks),
-            ollama_call=lambda: ollama_service.generate_mcqs(summary, context_chunks=context_chunks),
-            local_call=lambda: local_ai_service.generate_mcqs(summary, context_chunks=context_chunks),
+        mcqs = await _coalesce_inflight(
+            _inflight_mcqs,
+            (session_id, summary_key),
+            lambda: _run_with_fallback_chain(
+                operation="mcq",
+                gemini_call=lambda: get_gemini_service().generate_mcqs(summary, context_chunks=context_chunks),
+                ollama_call=lambda: ollama_service.generate_mcqs(summary, context_chunks=context_chunks),
+                local_call=lambda: local_ai_service.generate_mcqs(summary, context_chunks=context_chunks),
+            ),
         )
     except HTTPException:
         raise
@@ -376,7 +529,8 @@ async def generate_mcq(payload: MCQRequest) -> MCQResponse:
         logger.exception("MCQ generation failed: %s", exc)
         raise _map_service_error(exc) from exc
 
-    session_store.set_summary(session_id, summary.model_dump())
+    if payload.summary:
+        session_store.set_summary(session_id, summary.model_dump())
     session_store.set_mcqs(session_id, [item.model_dump() for item in mcqs])
 
     return MCQResponse(session_id=session_id, mcqs=mcqs)
@@ -392,13 +546,13 @@ async def download_pdf(session_id: str = Query(...)) -> StreamingResponse:
     if not raw_summary:
         raise HTTPException(status_code=400, detail="No summary available for this session.")
 
-    summary = StructuredSummary(**raw_summary)
-    mcqs = [MCQItem(**item) for item in session.get("mcqs", [])]
+    summary = StructuredSummary.model_construct(**raw_summary)
+    mcqs = [MCQItem.model_construct(**item) for item in session.get("mcqs", [])]
 
-    pdf_bytes = pdf_service.build(summary=summary, mcqs=mcqs)
+    pdf_buffer = await asyncio.to_thread(pdf_service.build, summary=summary, mcqs=mcqs)
 
     return StreamingResponse(
-        BytesIO(pdf_bytes),
+        pdf_buffer,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=edu-simplify-{session_id[:8]}.pdf"},
     )
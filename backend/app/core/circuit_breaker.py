@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import time
+from threading import Lock
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker so callers can skip a failing provider."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout_seconds
+        self._lock = Lock()
+        self._state = "closed"
+        self._failure_count = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and time.monotonic() - self._opened_at >= self._reset_timeout:
+                self._state = "half_open"
+                return True
+            # Open within the reset window, or half-open with the probe already in flight.
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failure_count = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == "half_open" or self._failure_count + 1 >= self._failure_threshold:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._failure_count = 0
+                return
+            self._failure_count += 1
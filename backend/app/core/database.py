@@ -26,7 +26,16 @@ class MongoStore:
 
         with self._lock:
             if self._client is None:
-                self._client = MongoClient(self._uri)
+                self._client = MongoClient(
+                    self._uri,
+                    maxPoolSize=50,
+                    minPoolSize=5,
+                    maxIdleTimeMS=120_000,
+                    waitQueueTimeoutMS=2_000,
+                    serverSelectionTimeoutMS=2_000,
+                    connectTimeoutMS=2_000,
+                    retryWrites=True,
+                )
             return self._client
 
     def get_database(self) -> Database:
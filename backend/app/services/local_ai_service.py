@@ -1,16 +1,22 @@
 from __future__ import annotations
 
 import ast
+import heapq
+import operator
+import os
 import re
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from threading import Lock
 
-from app.models.schemas import ChatMessage, MCQItem, StructuredSummary
+from app.models.schemas import MCQItem, StructuredSummary
 from app.services.pipeline_utils import (
     STOPWORDS,
     build_three_paragraph_overview,
     clean_transcript_text,
     dedupe_strings,
     select_top_chunks_for_query,
+    simhash64,
     split_into_chunks,
     split_sentences,
     tokenize_words,
@@ -18,8 +24,42 @@ from app.services.pipeline_utils import (
 )
 
 
+_WS_RE = re.compile(r"\s+")
+_DEFINITION_RE = re.compile(
+    r"(?P<term>[A-Za-z][A-Za-z0-9\-\s]{2,40})\s+(?:is|are|means|refers to|defined as)\s+(?P<definition>[^.;:]{10,220})",
+    flags=re.IGNORECASE,
+)
+_ARITH_RE = re.compile(r"[0-9\.\+\-\*\/\(\)\s%*]+")
+_CONCEPT_MARKER_RE = re.compile(r"key|core|principle|method|model|process")
+_EXAMPLE_MARKER_RE = re.compile(r"example|for instance|such as|suppose|consider|application|case")
+_LINEAR_RE = re.compile(
+    r"^\s*([+-]?\s*\d*\.?\d*)\s*x\s*([+-]\s*\d*\.?\d+)?\s*=\s*([+-]?\s*\d*\.?\d+)\s*$",
+    flags=re.IGNORECASE,
+)
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+    ast.FloorDiv: operator.floordiv,
+}
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+@lru_cache(maxsize=4096)
+def _point_token_set(point: str) -> frozenset[str]:
+    """Token set per knowledge point, cached across repeated chat turns."""
+    return frozenset(token for token in tokenize_words(point) if token not in STOPWORDS)
+
+
 def _shorten(text: str, max_chars: int = 180) -> str:
-    value = re.sub(r"\s+", " ", (text or "")).strip()
+    value = _WS_RE.sub(" ", (text or "")).strip()
     if len(value) <= max_chars:
         return value
     return value[:max_chars].rsplit(" ", 1)[0] + "..."
@@ -33,6 +73,92 @@ def _trim_items(items: list[str], label: str, min_items: int = 4, max_items: int
     return values
 
 
+def _extract_revision_points(concepts: list[str], top_terms: list[str]) -> list[str]:
+    output: list[str] = []
+    for concept in concepts[:4]:
+        output.append(f"Exam focus: {_shorten(concept, 150)}")
+
+    for term in top_terms[:4]:
+        output.append(f"Define {term.title()} and explain its role in the lecture framework.")
+
+    return output
+
+
+def _summarize_chunk(chunk: str) -> dict[str, list[str]]:
+    sentences = split_sentences(chunk)
+    if not sentences:
+        sentences = [_shorten(chunk, 200)]
+
+    # Plain dict counting beats Counter's __missing__ dispatch on this hot
+    # path, and nlargest only heapifies the 12 winners instead of sorting.
+    is_stopword = STOPWORDS.__contains__
+    token_counts: dict[str, int] = {}
+    for token in tokenize_words(chunk):
+        if not is_stopword(token):
+            token_counts[token] = token_counts.get(token, 0) + 1
+    top_terms = [word for word, _ in heapq.nlargest(12, token_counts.items(), key=lambda item: item[1])]
+
+    definitions: list[str] = []
+    examples: list[str] = []
+    ranked: list[tuple[int, str]] = []
+
+    # One walk over the sentence list: lowercase and tokenize each sentence
+    # once, and feed the definition, concept, and example extraction together.
+    for position, sentence in enumerate(sentences):
+        lowered = sentence.lower()
+        tokens = {token for token in tokenize_words(sentence) if not is_stopword(token)}
+
+        if position < 40:
+            match = _DEFINITION_RE.search(sentence)
+            if match:
+                term = " ".join(match.group("term").split()[-5:])
+                definition = _shorten(match.group("definition").strip(" -"), 170).rstrip(".")
+                definitions.append(f"{term.title()}: {definition}.")
+
+        if tokens:
+            score = sum(token_counts.get(token, 0) for token in tokens)
+            if _CONCEPT_MARKER_RE.search(lowered):
+                score += 3
+            ranked.append((score, sentence))
+
+        if _EXAMPLE_MARKER_RE.search(lowered):
+            examples.append(_shorten(sentence, 180))
+
+    for term in top_terms:
+        if len(definitions) >= 8:
+            break
+        definitions.append(f"{term.title()}: A recurring technical term in this lecture that should be defined clearly.")
+
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    concepts = [_shorten(item[1], 190) for item in ranked[:8]]
+
+    if len(examples) < 4:
+        for concept in concepts[:4]:
+            examples.append(f"Application view: {_shorten(concept, 145)}")
+
+    revision = _extract_revision_points(concepts, top_terms)
+
+    return {
+        "definitions": definitions,
+        "concepts": concepts,
+        "examples": examples,
+        "revision": revision,
+    }
+
+
+_chunk_executor: ProcessPoolExecutor | None = None
+_chunk_executor_lock = Lock()
+
+
+def _get_chunk_executor() -> ProcessPoolExecutor:
+    """Shared worker pool for chunk summarization, created on first use."""
+    global _chunk_executor
+    with _chunk_executor_lock:
+        if _chunk_executor is None:
+            _chunk_executor = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4))
+        return _chunk_executor
+
+
 class LocalAIService:
     def summarize(self, transcript: str) -> StructuredSummary:
         cleaned = clean_transcript_text(transcript)
@@ -40,13 +166,38 @@ class LocalAIService:
         if not chunks and cleaned:
             chunks = [cleaned]
 
+        # Same SimHash screen as the Ollama map phase: a chunk within 3 bits
+        # of an earlier one is a paraphrase (repeated slides, overlap bleed)
+        # and would only re-extract material dedupe_strings discards later.
+        kept_signatures: list[int] = []
+        unique_chunks: list[str] = []
+        for chunk in chunks:
+            signature = simhash64(tokenize_words(chunk))
+            if any((signature ^ kept).bit_count() <= 3 for kept in kept_signatures):
+                continue
+            kept_signatures.append(signature)
+            unique_chunks.append(chunk)
+
+        # Chunk extraction is pure CPU work with no shared state; fan it out
+        # across the worker pool once there is enough of it to amortize the
+        # pickling, and fall back to the serial path if the pool is unusable.
+        if len(unique_chunks) >= 3:
+            try:
+                chunk_outputs = list(_get_chunk_executor().map(_summarize_chunk, unique_chunks))
+            except Exception:
+                global _chunk_executor
+                with _chunk_executor_lock:
+                    _chunk_executor = None
+                chunk_outputs = [_summarize_chunk(chunk) for chunk in unique_chunks]
+        else:
+            chunk_outputs = [_summarize_chunk(chunk) for chunk in unique_chunks]
+
         all_definitions: list[str] = []
         all_concepts: list[str] = []
         all_examples: list[str] = []
         all_revision: list[str] = []
 
-        for chunk in chunks:
-            chunk_output = self._summarize_chunk(chunk)
+        for chunk_output in chunk_outputs:
             all_definitions.extend(chunk_output["definitions"])
             all_concepts.extend(chunk_output["concepts"])
             all_examples.extend(chunk_output["examples"])
@@ -66,95 +217,11 @@ class LocalAIService:
         )
         return validate_structured_summary(summary, cleaned)
 
-    def _summarize_chunk(self, chunk: str) -> dict[str, list[str]]:
-        sentences = split_sentences(chunk)
-        if not sentences:
-            sentences = [_shorten(chunk, 200)]
-
-        token_counts = Counter(token for token in tokenize_words(chunk) if token not in STOPWORDS)
-        top_terms = [word for word, _ in token_counts.most_common(12)]
-
-        definitions = self._extract_definitions(sentences, top_terms)
-        concepts = self._extract_core_concepts(sentences, token_counts)
-        examples = self._extract_examples(sentences, concepts)
-        revision = self._extract_revision_points(concepts, top_terms)
-
-        return {
-            "definitions": definitions,
-            "concepts": concepts,
-            "examples": examples,
-            "revision": revision,
-        }
-
-    @staticmethod
-    def _extract_definitions(sentences: list[str], top_terms: list[str]) -> list[str]:
-        output: list[str] = []
-        pattern = re.compile(
-            r"(?P<term>[A-Za-z][A-Za-z0-9\-\s]{2,40})\s+(?:is|are|means|refers to|defined as)\s+(?P<definition>[^.;:]{10,220})",
-            flags=re.IGNORECASE,
-        )
-
-        for sentence in sentences[:40]:
-            match = pattern.search(sentence)
-            if not match:
-                continue
-            term = " ".join(match.group("term").split()[-5:])
-            definition = _shorten(match.group("definition").strip(" -"), 170).rstrip(".")
-            output.append(f"{term.title()}: {definition}.")
-
-        for term in top_terms:
-            if len(output) >= 8:
-                break
-            output.append(f"{term.title()}: A recurring technical term in this lecture that should be defined clearly.")
-
-        return output
-
-    @staticmethod
-    def _extract_core_concepts(sentences: list[str], token_counts: Counter[str]) -> list[str]:
-        ranked: list[tuple[int, str]] = []
-        for sentence in sentences:
-            tokens = {token for token in tokenize_words(sentence) if token not in STOPWORDS}
-            if not tokens:
-                continue
-            score = sum(token_counts.get(token, 0) for token in tokens)
-            if any(marker in sentence.lower() for marker in {"key", "core", "principle", "method", "model", "process"}):
-                score += 3
-            ranked.append((score, sentence))
-
-        ranked.sort(key=lambda item: item[0], reverse=True)
-        return [_shorten(item[1], 190) for item in ranked[:8]]
-
-    @staticmethod
-    def _extract_examples(sentences: list[str], concepts: list[str]) -> list[str]:
-        markers = {"example", "for instance", "such as", "suppose", "consider", "application", "case"}
-        output = [
-            _shorten(sentence, 180)
-            for sentence in sentences
-            if any(marker in sentence.lower() for marker in markers)
-        ]
-
-        if len(output) < 4:
-            for concept in concepts[:4]:
-                output.append(f"Application view: {_shorten(concept, 145)}")
-
-        return output
-
-    @staticmethod
-    def _extract_revision_points(concepts: list[str], top_terms: list[str]) -> list[str]:
-        output: list[str] = []
-        for concept in concepts[:4]:
-            output.append(f"Exam focus: {_shorten(concept, 150)}")
-
-        for term in top_terms[:4]:
-            output.append(f"Define {term.title()} and explain its role in the lecture framework.")
-
-        return output
-
     def chat(
         self,
         message: str,
         summary: StructuredSummary,
-        history: list[ChatMessage],
+        history: list[dict],
         context_chunks: list[str] | None = None,
     ) -> str:
         del history
@@ -180,13 +247,11 @@ class LocalAIService:
         ranked_points: list[tuple[int, str]] = []
 
         for point in knowledge_pool:
-            point_tokens = {token for token in tokenize_words(point) if token not in STOPWORDS}
-            score = len(question_tokens & point_tokens)
+            score = len(question_tokens & _point_token_set(point))
             if score > 0:
                 ranked_points.append((score, point))
 
-        ranked_points.sort(key=lambda item: item[0], reverse=True)
-        best_points = [item[1] for item in ranked_points[:3]]
+        best_points = [item[1] for item in heapq.nlargest(3, ranked_points, key=lambda item: item[0])]
 
         if not best_points and not selected_contexts:
             return (
@@ -194,17 +259,17 @@ class LocalAIService:
                 "Ask with terms from key definitions or core concepts."
             )
 
-        lines = ["Answer grounded in current lecture notes:"]
-        for point in best_points:
-            lines.append(f"- {_shorten(point, 170)}")
+        parts = [
+            "Answer grounded in current lecture notes:",
+            *(f"- {_shorten(point, 170)}" for point in best_points),
+        ]
 
         if selected_contexts:
-            lines.append("Supporting lecture context:")
-            for chunk in selected_contexts[:2]:
-                lines.append(f"- {_shorten(chunk, 190)}")
+            parts.append("Supporting lecture context:")
+            parts.extend(f"- {_shorten(chunk, 190)}" for chunk in selected_contexts[:2])
 
-        lines.append("If needed, ask for a short 5-mark exam answer format.")
-        return "\n".join(lines)
+        parts.append("If needed, ask for a short 5-mark exam answer format.")
+        return "\n".join(parts)
 
     def generate_mcqs(self, summary: StructuredSummary, context_chunks: list[str] | None = None) -> list[MCQItem]:
         context_facts: list[str] = []
@@ -222,15 +287,19 @@ class LocalAIService:
         if not pool:
             pool = ["The lecture covers foundational concepts and their practical usage."]
 
+        # Shorten and lowercase the pool once instead of inside the 5x loop.
+        pool_shortened = [_shorten(candidate, 110) for candidate in pool]
+        pool_lower = [option.lower() for option in pool_shortened]
+
         mcqs: list[MCQItem] = []
         for index in range(5):
             fact = _shorten(pool[index % len(pool)], 120)
+            fact_lower = fact.lower()
             question = f"Which option is most consistent with this lecture statement: \"{fact}\"?"
 
             distractors: list[str] = []
-            for candidate in pool:
-                option = _shorten(candidate, 110)
-                if option.lower() == fact.lower():
+            for option, option_lower in zip(pool_shortened, pool_lower):
+                if option_lower == fact_lower:
                     continue
                 distractors.append(option)
                 if len(distractors) >= 3:
@@ -261,7 +330,7 @@ class LocalAIService:
     def solver_chat(
         self,
         message: str,
-        history: list[ChatMessage],
+        history: list[dict],
         image_bytes: bytes | None = None,
         image_mime_type: str | None = None,
         image_data_url: str | None = None,
@@ -270,7 +339,7 @@ class LocalAIService:
         del image_bytes
         del image_mime_type
 
-        question = re.sub(r"\s+", " ", (message or "")).strip()
+        question = _WS_RE.sub(" ", (message or "")).strip()
         if not question and image_data_url:
             return (
                 "Offline mode cannot read image content directly. "
@@ -300,47 +369,44 @@ class LocalAIService:
             "Send the exact equation, code snippet, or full problem text for a precise solution."
         )
 
-    @staticmethod
-    def _safe_eval(expr: str) -> float:
-        node = ast.parse(expr, mode="eval")
-        allowed_nodes = (
-            ast.Expression,
-            ast.BinOp,
-            ast.UnaryOp,
-            ast.Constant,
-            ast.Add,
-            ast.Sub,
-            ast.Mult,
-            ast.Div,
-            ast.Pow,
-            ast.Mod,
-            ast.FloorDiv,
-            ast.UAdd,
-            ast.USub,
-            ast.Load,
-        )
-
-        for subnode in ast.walk(node):
-            if not isinstance(subnode, allowed_nodes):
+    @classmethod
+    def _eval_node(cls, node: ast.expr) -> float:
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+                return node.value
+            raise ValueError("Expression contains non-numeric values")
+        if isinstance(node, ast.BinOp):
+            op = _BIN_OPS.get(type(node.op))
+            if op is None:
+                raise ValueError("Unsupported expression")
+            return op(cls._eval_node(node.left), cls._eval_node(node.right))
+        if isinstance(node, ast.UnaryOp):
+            op = _UNARY_OPS.get(type(node.op))
+            if op is None:
                 raise ValueError("Unsupported expression")
-            if isinstance(subnode, ast.Constant) and not isinstance(subnode.value, (int, float)):
-                raise ValueError("Expression contains non-numeric values")
+            return op(cls._eval_node(node.operand))
+        raise ValueError("Unsupported expression")
 
-        return float(eval(compile(node, "<expr>", "eval"), {"__builtins__": {}}, {}))
+    @classmethod
+    def _safe_eval(cls, expr: str) -> float:
+        # Evaluate the AST directly: validation and evaluation happen in one
+        # walk, with no compile() pass and no eval() surface at all.
+        node = ast.parse(expr, mode="eval")
+        return float(cls._eval_node(node.body))
 
     def _solve_arithmetic(self, question: str) -> str | None:
         if not question:
             return None
 
         candidate = question.strip().replace("^", "**")
-        if not re.fullmatch(r"[0-9\.\+\-\*\/\(\)\s%*]+", candidate):
+        if not _ARITH_RE.fullmatch(candidate):
             lowered = candidate.lower()
             for prefix in ("calculate", "compute", "evaluate", "solve"):
                 if lowered.startswith(prefix):
                     candidate = candidate[len(prefix) :].strip(" :")
                     break
 
-        if not re.fullmatch(r"[0-9\.\+\-\*\/\(\)\s%*]+", candidate):
+        if not _ARITH_RE.fullmatch(candidate):
             return None
 
         try:
@@ -369,11 +435,7 @@ class LocalAIService:
         if not question:
             return None
 
-        pattern = re.compile(
-            r"^\s*([+-]?\s*\d*\.?\d*)\s*x\s*([+-]\s*\d*\.?\d+)?\s*=\s*([+-]?\s*\d*\.?\d+)\s*$",
-            flags=re.IGNORECASE,
-        )
-        match = pattern.match(question)
+        match = _LINEAR_RE.match(question)
         if not match:
             return None
 
@@ -1,9 +1,20 @@
 from __future__ import annotations
 
-import base64
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from typing import Any
 
 import httpx
+import orjson
+
+try:
+    # SIMD-accelerated encoder; multi-MB problem screenshots encode several
+    # times faster than the stdlib loop. Optional dependency.
+    from pybase64 import b64encode
+except ImportError:  # pragma: no cover - depends on deployment environment
+    from base64 import b64encode
 
 from app.core.prompts import (
     build_chat_prompt,
@@ -15,9 +26,24 @@ from app.core.prompts import (
     build_summary_synthesis_prompt,
     build_summary_validation_prompt,
 )
-from app.models.schemas import ChatMessage, MCQItem, StructuredSummary
-from app.services.llm_utils import extract_json_payload, normalize_mcq_item, normalize_summary
-from app.services.pipeline_utils import clean_transcript_text, split_into_chunks, validate_structured_summary
+from app.models.schemas import MCQItem, StructuredSummary
+from app.services.llm_utils import (
+    RETRY_JSON_ONLY,
+    RETRY_JSON_SHORT,
+    extract_json_payload,
+    normalize_mcq_item,
+    normalize_summary,
+)
+from app.services.pipeline_utils import (
+    clean_transcript_text,
+    simhash64,
+    split_into_chunks,
+    tokenize_words,
+    validate_structured_summary,
+)
+
+
+_JSON_CACHE_MAX_ENTRIES = 256
 
 
 class OllamaService:
@@ -25,6 +51,17 @@ class OllamaService:
         self._enabled = enabled
         self._base_url = base_url.rstrip("/")
         self._model_name = model_name
+        # One persistent client with keep-alive instead of a fresh connection
+        # per call; generate calls can overlap, httpx.Client is thread-safe.
+        self._client = httpx.Client(
+            base_url=self._base_url,
+            timeout=120,
+            limits=httpx.Limits(max_keepalive_connections=8),
+        )
+        # Exact-match LRU over parsed JSON generations; chunk prompts are
+        # deterministic, so re-uploads of the same transcript hit this cache.
+        self._json_cache: OrderedDict[tuple[str, float], Any] = OrderedDict()
+        self._json_cache_lock = Lock()
 
     @property
     def enabled(self) -> bool:
@@ -34,11 +71,14 @@ class OllamaService:
         if not self._enabled:
             raise RuntimeError("Ollama fallback is disabled.")
 
-        url = f"{self._base_url}/api/generate"
         payload: dict[str, Any] = {
             "model": self._model_name,
             "prompt": prompt,
-            "stream": False,
+            # Stream token lines so decoding overlaps generation instead of
+            # waiting for the model to finish before any bytes arrive.
+            "stream": True,
+            # Keep the model resident between calls instead of reloading it.
+            "keep_alive": "10m",
             "options": {
                 "temperature": temperature,
             },
@@ -46,34 +86,58 @@ class OllamaService:
         if images:
             payload["images"] = images
 
+        pieces: list[str] = []
         try:
-            response = httpx.post(url, json=payload, timeout=120)
+            with self._client.stream("POST", "/api/generate", json=payload) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    raise RuntimeError(
+                        f"Ollama request failed ({response.status_code}): {response.text.strip()}"
+                    )
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    try:
+                        data = orjson.loads(line)
+                    except orjson.JSONDecodeError as exc:
+                        raise RuntimeError(f"Ollama returned non-JSON response: {exc}") from exc
+                    piece = data.get("response")
+                    if piece:
+                        pieces.append(str(piece))
+                    if data.get("done"):
+                        break
+        except RuntimeError:
+            raise
         except Exception as exc:
             raise RuntimeError(f"Ollama request failed: {exc}") from exc
 
-        if response.status_code >= 400:
-            raise RuntimeError(f"Ollama request failed ({response.status_code}): {response.text.strip()}")
-
-        try:
-            data = response.json()
-        except Exception as exc:
-            raise RuntimeError(f"Ollama returned non-JSON response: {exc}") from exc
-
-        text = str(data.get("response", "")).strip()
+        text = "".join(pieces).strip()
         if not text:
             raise RuntimeError("Ollama returned an empty response.")
 
         return text
 
     def _generate_json(self, prompt: str, temperature: float = 0.2) -> Any:
+        cache_key = (hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest(), temperature)
+        with self._json_cache_lock:
+            if cache_key in self._json_cache:
+                self._json_cache.move_to_end(cache_key)
+                return self._json_cache[cache_key]
+
         response_text = self._generate(prompt=prompt, temperature=temperature)
 
         try:
-            return extract_json_payload(response_text)
+            data = extract_json_payload(response_text)
         except Exception:
-            retry_prompt = prompt + "\n\nReturn JSON only. No markdown."
+            retry_prompt = prompt + RETRY_JSON_ONLY
             retry_text = self._generate(prompt=retry_prompt, temperature=max(0.1, temperature - 0.1))
-            return extract_json_payload(retry_text)
+            data = extract_json_payload(retry_text)
+
+        with self._json_cache_lock:
+            self._json_cache[cache_key] = data
+            if len(self._json_cache) > _JSON_CACHE_MAX_ENTRIES:
+                self._json_cache.popitem(last=False)
+        return data
 
     def summarize(self, transcript: str) -> StructuredSummary:
         cleaned = clean_transcript_text(transcript)
@@ -85,14 +149,38 @@ class OllamaService:
                 raise RuntimeError("Could not parse structured summary from Ollama response.")
             return validate_structured_summary(normalize_summary(data), cleaned)
 
-        chunk_notes: list[dict[str, Any]] = []
-        for index, chunk in enumerate(chunks, start=1):
-            chunk_data = self._generate_json(
-                build_summary_chunk_prompt(chunk_text=chunk, chunk_index=index, total_chunks=len(chunks)),
-                temperature=0.2,
-            )
-            if isinstance(chunk_data, dict):
-                chunk_notes.append(chunk_data)
+        # Near-duplicate chunks (repeated slide text, restatements across the
+        # overlap window) add latency without adding notes; skip any chunk
+        # whose SimHash is within 3 bits of one already kept.
+        kept_signatures: list[int] = []
+        unique_chunks: list[str] = []
+        for chunk in chunks:
+            signature = simhash64(tokenize_words(chunk))
+            if any((signature ^ kept).bit_count() <= 3 for kept in kept_signatures):
+                continue
+            kept_signatures.append(signature)
+            unique_chunks.append(chunk)
+
+        chunk_prompts = [
+            build_summary_chunk_prompt(chunk_text=chunk, chunk_index=index, total_chunks=len(unique_chunks))
+            for index, chunk in enumerate(unique_chunks, start=1)
+        ]
+
+        def generate_chunk_notes(chunk_prompt: str) -> Any:
+            try:
+                return self._generate_json(chunk_prompt, temperature=0.2)
+            except Exception:
+                return None
+
+        if len(chunk_prompts) == 1:
+            chunk_results = [generate_chunk_notes(chunk_prompts[0])]
+        else:
+            # Overlap the independent chunk calls; keep concurrency modest so a
+            # single summarize request does not saturate the Ollama host.
+            with ThreadPoolExecutor(max_workers=min(4, len(chunk_prompts))) as executor:
+                chunk_results = list(executor.map(generate_chunk_notes, chunk_prompts))
+
+        chunk_notes: list[dict[str, Any]] = [data for data in chunk_results if isinstance(data, dict)]
 
         reduced_data = self._generate_json(build_summary_reduce_prompt(chunk_notes), temperature=0.2)
         reduced = reduced_data if isinstance(reduced_data, dict) else {}
@@ -119,26 +207,25 @@ class OllamaService:
         self,
         message: str,
         summary: StructuredSummary,
-        history: list[ChatMessage],
+        history: list[dict],
         context_chunks: list[str] | None = None,
     ) -> str:
-        history_payload = [item.model_dump() for item in history]
         prompt = build_chat_prompt(
-            summary=summary.model_dump(),
+            summary=summary.cached_dump(),
             message=message,
-            history=history_payload,
+            history=history,
             context_chunks=context_chunks or [],
         )
         return self._generate(prompt=prompt, temperature=0.3)
 
     def generate_mcqs(self, summary: StructuredSummary, context_chunks: list[str] | None = None) -> list[MCQItem]:
-        prompt = build_mcq_prompt(summary.model_dump(), context_chunks=context_chunks or [])
+        prompt = build_mcq_prompt(summary.cached_dump(), context_chunks=context_chunks or [])
         response_text = self._generate(prompt=prompt, temperature=0.3)
 
         try:
             data = extract_json_payload(response_text)
         except Exception:
-            retry_prompt = prompt + "\n\nReturn JSON only."
+            retry_prompt = prompt + RETRY_JSON_SHORT
             data = extract_json_payload(self._generate(retry_prompt, temperature=0.1))
 
         if isinstance(data, dict):
@@ -160,7 +247,7 @@ class OllamaService:
     def solver_chat(
         self,
         message: str,
-        history: list[ChatMessage],
+        history: list[dict],
         image_bytes: bytes | None = None,
         image_mime_type: str | None = None,
         image_data_url: str | None = None,
@@ -168,11 +255,10 @@ class OllamaService:
         del image_mime_type
         del image_data_url
 
-        history_payload = [item.model_dump() for item in history]
-        prompt = build_solver_chat_prompt(message=message, history=history_payload)
+        prompt = build_solver_chat_prompt(message=message, history=history)
 
         images: list[str] | None = None
         if image_bytes:
-            images = [base64.b64encode(image_bytes).decode("utf-8")]
+            images = [b64encode(image_bytes).decode("ascii")]
 
         return self._generate(prompt=prompt, temperature=0.3, images=images)
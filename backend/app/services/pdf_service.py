@@ -11,22 +11,64 @@ from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
 
 from app.models.schemas import MCQItem, StructuredSummary
 
+# The style tree is pure and identical for every document; build it once at
+# import instead of per request.
+_BASE_STYLES = getSampleStyleSheet()
+_STYLES = {
+    "title": ParagraphStyle(
+        "Title",
+        parent=_BASE_STYLES["Title"],
+        fontSize=20,
+        textColor=colors.HexColor("#0F172A"),
+        spaceAfter=10,
+    ),
+    "meta": ParagraphStyle(
+        "Meta",
+        parent=_BASE_STYLES["Normal"],
+        fontSize=9,
+        textColor=colors.HexColor("#475569"),
+        spaceAfter=12,
+    ),
+    "section": ParagraphStyle(
+        "Section",
+        parent=_BASE_STYLES["Heading2"],
+        fontSize=13,
+        textColor=colors.HexColor("#1E293B"),
+        spaceAfter=5,
+    ),
+    "body": ParagraphStyle(
+        "Body",
+        parent=_BASE_STYLES["Normal"],
+        fontSize=10.5,
+        leading=14,
+        textColor=colors.HexColor("#0F172A"),
+    ),
+}
+
+_OPTION_LABELS = ("A", "B", "C", "D")
+
+# Spacers carry no state between draws, so every gap of the same size can
+# share one instance instead of allocating a new flowable per list item.
+_SMALL_SPACER = Spacer(1, 0.15 * cm)
+_MED_SPACER = Spacer(1, 0.2 * cm)
+_MCQ_SPACER = Spacer(1, 0.25 * cm)
+_SECTION_GAP_SPACER = Spacer(1, 0.3 * cm)
+
 
 class PDFService:
     @staticmethod
     def _section(story: list, title: str, items: list[str], styles: dict) -> None:
         story.append(Paragraph(title, styles["section"]))
         if not items:
-            story.append(Paragraph("No content generated.", styles["body"]))
-            story.append(Spacer(1, 0.2 * cm))
+            story.extend((Paragraph("No content generated.", styles["body"]), _MED_SPACER))
             return
 
+        body = styles["body"]
         for item in items:
-            story.append(Paragraph(f"- {item}", styles["body"]))
-            story.append(Spacer(1, 0.15 * cm))
-        story.append(Spacer(1, 0.2 * cm))
+            story.extend((Paragraph(f"- {item}", body), _SMALL_SPACER))
+        story.append(_MED_SPACER)
 
-    def build(self, summary: StructuredSummary, mcqs: list[MCQItem]) -> bytes:
+    def build(self, summary: StructuredSummary, mcqs: list[MCQItem]) -> BytesIO:
         buffer = BytesIO()
         doc = SimpleDocTemplate(
             buffer,
@@ -38,37 +80,7 @@ class PDFService:
             title="Edu Simplify Notes",
         )
 
-        base_styles = getSampleStyleSheet()
-        styles = {
-            "title": ParagraphStyle(
-                "Title",
-                parent=base_styles["Title"],
-                fontSize=20,
-                textColor=colors.HexColor("#0F172A"),
-                spaceAfter=10,
-            ),
-            "meta": ParagraphStyle(
-                "Meta",
-                parent=base_styles["Normal"],
-                fontSize=9,
-                textColor=colors.HexColor("#475569"),
-                spaceAfter=12,
-            ),
-            "section": ParagraphStyle(
-                "Section",
-                parent=base_styles["Heading2"],
-                fontSize=13,
-                textColor=colors.HexColor("#1E293B"),
-                spaceAfter=5,
-            ),
-            "body": ParagraphStyle(
-                "Body",
-                parent=base_styles["Normal"],
-                fontSize=10.5,
-                leading=14,
-                textColor=colors.HexColor("#0F172A"),
-            ),
-        }
+        styles = _STYLES
 
         story: list = []
         story.append(Paragraph("Edu Simplify Study Notes", styles["title"]))
@@ -80,25 +92,23 @@ class PDFService:
         self._section(story, "Important Examples", summary.important_examples, styles)
         self._section(story, "Exam Revision Points", summary.exam_revision_points, styles)
 
-        story.append(Spacer(1, 0.3 * cm))
-        story.append(Paragraph("MCQ Practice", styles["section"]))
+        story.extend((_SECTION_GAP_SPACER, Paragraph("MCQ Practice", styles["section"])))
 
         if not mcqs:
             story.append(Paragraph("No MCQs generated yet.", styles["body"]))
         else:
-            option_labels = ["A", "B", "C", "D"]
             for index, mcq in enumerate(mcqs, start=1):
                 story.append(Paragraph(f"Q{index}. {mcq.question}", styles["body"]))
-                for opt_index, option in enumerate(mcq.options):
-                    story.append(Paragraph(f"{option_labels[opt_index]}. {option}", styles["body"]))
+                for label, option in zip(_OPTION_LABELS, mcq.options):
+                    story.append(Paragraph(f"{label}. {option}", styles["body"]))
                 story.append(
                     Paragraph(
-                        f"Correct: {option_labels[mcq.correct_index]}. {mcq.options[mcq.correct_index]}",
+                        f"Correct: {_OPTION_LABELS[mcq.correct_index]}. {mcq.options[mcq.correct_index]}",
                         styles["body"],
                     )
                 )
-                story.append(Paragraph(f"Explanation: {mcq.explanation}", styles["body"]))
-                story.append(Spacer(1, 0.25 * cm))
+                story.extend((Paragraph(f"Explanation: {mcq.explanation}", styles["body"]), _MCQ_SPACER))
 
         doc.build(story)
-        return buffer.getvalue()
+        buffer.seek(0)
+        return buffer
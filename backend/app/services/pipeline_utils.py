@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import heapq
 import re
 from collections import Counter
-from typing import Iterable
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Iterable, Iterator
 
 from app.models.schemas import StructuredSummary
 
-STOPWORDS = {
+STOPWORDS = frozenset({
     "a",
     "an",
     "and",
@@ -73,7 +76,21 @@ STOPWORDS = {
     "after",
     "over",
     "under",
-}
+})
+
+
+# Compiled once at import so the hot text paths skip re's per-call cache probe.
+# Timestamps, bracketed/parenthesized stage notes, and speaker labels scrub in
+# a single alternation pass; the whitespace collapse then absorbs the gaps.
+_RE_SCRUB = re.compile(
+    r"\b\d{1,2}:\d{2}(?::\d{2})?\b"
+    r"|\[[^\]]{1,40}\]"
+    r"|\([^\)]{1,40}\)"
+    r"|(?m:^[A-Z][A-Z\s]{2,20}:\s*)"
+)
+_RE_WS = re.compile(r"\s+")
+_RE_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_RE_PARAGRAPH_SPLIT = re.compile(r"\n{2,}")
 
 
 def clean_transcript_text(text: str, max_chars: int = 120000) -> str:
@@ -81,21 +98,24 @@ def clean_transcript_text(text: str, max_chars: int = 120000) -> str:
     if not value:
         return ""
 
-    value = re.sub(r"\b\d{1,2}:\d{2}(?::\d{2})?\b", " ", value)
-    value = re.sub(r"\[[^\]]{1,40}\]", " ", value)
-    value = re.sub(r"\([^\)]{1,40}\)", " ", value)
-    value = re.sub(r"(?m)^[A-Z][A-Z\s]{2,20}:\s*", "", value)
-    value = re.sub(r"\s+", " ", value).strip()
+    # Anything past the cap is discarded after cleaning anyway; trim early
+    # (with 2x slack since scrubbing shrinks text) so the regex passes never
+    # walk a 500K-char auto-caption dump.
+    if len(value) > max_chars * 2:
+        value = value[: max_chars * 2]
+
+    value = _RE_SCRUB.sub(" ", value)
+    value = _RE_WS.sub(" ", value).strip()
     if len(value) > max_chars:
         value = value[:max_chars] + " [Transcript truncated]"
     return value
 
 
 def split_sentences(text: str) -> list[str]:
-    chunks = re.split(r"(?<=[.!?])\s+|\n+", text)
+    chunks = _RE_SENTENCE_SPLIT.split(text)
     output: list[str] = []
     for chunk in chunks:
-        item = re.sub(r"\s+", " ", chunk).strip()
+        item = _RE_WS.sub(" ", chunk).strip()
         if len(item) < 18:
             continue
         output.append(item)
@@ -107,81 +127,171 @@ def split_into_chunks(
     max_chars: int = 2600,
     overlap_chars: int = 220,
     max_chunks: int = 12,
+    already_clean: bool = False,
 ) -> list[str]:
-    cleaned = clean_transcript_text(text)
+    cleaned = text if already_clean else clean_transcript_text(text)
     if not cleaned:
         return []
 
-    paragraphs = [part.strip() for part in re.split(r"\n{2,}", cleaned) if part.strip()]
+    paragraphs = [part.strip() for part in _RE_PARAGRAPH_SPLIT.split(cleaned) if part.strip()]
     if not paragraphs:
         paragraphs = split_sentences(cleaned)
 
+    # Accumulate paragraph pieces and a running length instead of rebuilding
+    # the joined string per iteration, which was quadratic in chunk size.
     chunks: list[str] = []
-    current = ""
+    parts: list[str] = []
+    current_len = 0
 
     for part in paragraphs:
-        candidate = f"{current}\n{part}".strip() if current else part
-        if len(candidate) <= max_chars:
-            current = candidate
+        added = len(part) + (1 if parts else 0)
+        if current_len + added <= max_chars:
+            parts.append(part)
+            current_len += added
             continue
 
-        if current:
-            chunks.append(current.strip())
+        if parts:
+            joined = "\n".join(parts)
+            chunks.append(joined.strip())
             if len(chunks) >= max_chunks:
                 break
-            overlap = current[-overlap_chars:] if overlap_chars > 0 else ""
-            current = f"{overlap}\n{part}".strip()
+            overlap = joined[-overlap_chars:].lstrip() if overlap_chars > 0 else ""
+            parts = [overlap, part] if overlap else [part]
+            current_len = len(overlap) + 1 + len(part) if overlap else len(part)
         else:
-            hard_slice = part[:max_chars]
-            chunks.append(hard_slice.strip())
+            chunks.append(part[:max_chars].strip())
             if len(chunks) >= max_chunks:
                 break
-            current = part[max_chars - overlap_chars :].strip()
+            remainder = part[max_chars - overlap_chars :].strip()
+            parts = [remainder] if remainder else []
+            current_len = len(remainder)
 
-    if current and len(chunks) < max_chunks:
-        chunks.append(current.strip())
+    if parts and len(chunks) < max_chunks:
+        chunks.append("\n".join(parts).strip())
 
     return [chunk for chunk in chunks if chunk]
 
 
+_WORD_RE = re.compile(r"[a-z][a-z0-9'-]{2,}")
+# Map every ASCII char that cannot appear inside a token to a space, so ASCII
+# text tokenizes with translate+split instead of a regex scan.
+_PUNCT_TABLE = str.maketrans(
+    {chr(code): " " for code in range(128) if chr(code) not in "abcdefghijklmnopqrstuvwxyz0123456789'-"}
+)
+_LEADING_NON_LETTERS = "0123456789'-"
+
+
 def tokenize_words(text: str) -> list[str]:
-    return re.findall(r"[A-Za-z][A-Za-z0-9'-]{2,}", (text or "").lower())
+    value = (text or "").lower()
+    if value.isascii():
+        output: list[str] = []
+        for word in value.translate(_PUNCT_TABLE).split():
+            word = word.lstrip(_LEADING_NON_LETTERS)
+            if len(word) >= 3:
+                output.append(word)
+        return output
+    return _WORD_RE.findall(value)
+
+
+def iter_content_tokens(text: str) -> Iterator[str]:
+    """Lazily yield lowercase non-stopword tokens; feeds Counter/set builders
+    without materializing the intermediate token list."""
+    is_stopword = STOPWORDS.__contains__
+    value = (text or "").lower()
+    if value.isascii():
+        for word in value.translate(_PUNCT_TABLE).split():
+            word = word.lstrip(_LEADING_NON_LETTERS)
+            if len(word) >= 3 and not is_stopword(word):
+                yield word
+        return
+    for match in _WORD_RE.finditer(value):
+        token = match.group()
+        if not is_stopword(token):
+            yield token
+
+
+def simhash64(tokens: Iterable[str]) -> int:
+    """64-bit SimHash of a token stream for cheap near-duplicate detection."""
+    weights = [0] * 64
+    for token in tokens:
+        token_hash = int.from_bytes(blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            if token_hash >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
 
 
 def dedupe_strings(items: Iterable[str]) -> list[str]:
-    seen: set[str] = set()
-    output: list[str] = []
+    # An insertion-ordered dict doubles as the seen-set; the whitespace
+    # collapse only runs for strings that actually need it, which summary
+    # items rarely do by the time they reach here.
+    output: dict[str, str] = {}
     for item in items:
-        value = re.sub(r"\s+", " ", (item or "")).strip()
-        if not value:
+        if not item:
             continue
-        key = value.lower()
-        if key in seen:
+        if "  " in item or "\n" in item or "\t" in item or "\r" in item:
+            value = " ".join(item.split())
+        else:
+            value = item.strip()
+        if not value:
             continue
-        seen.add(key)
-        output.append(value)
-    return output
+        output.setdefault(value.lower(), value)
+    return list(output.values())
 
 
-def select_top_chunks_for_query(query: str, chunks: list[str], top_k: int = 4) -> list[str]:
+def build_chunk_index(chunks: list[str]) -> list[tuple[Counter[str], int]]:
+    """Precompute per-chunk token counts so repeated queries skip re-tokenization."""
+    return [(Counter(iter_content_tokens(chunk)), len(chunk)) for chunk in chunks]
+
+
+@lru_cache(maxsize=64)
+def _cached_chunk_index(chunks_key: tuple[str, ...]) -> list[tuple[Counter[str], int]]:
+    """Fallback index for callers that pass bare chunk lists; validation
+    retries re-query the same chunks several times per summary."""
+    return build_chunk_index(list(chunks_key))
+
+
+def select_top_chunks_for_query(
+    query: str,
+    chunks: list[str],
+    top_k: int = 4,
+    chunk_index: list[tuple[Counter[str], int]] | None = None,
+) -> list[str]:
     if not chunks:
         return []
 
-    query_tokens = [token for token in tokenize_words(query) if token not in STOPWORDS]
-    if not query_tokens:
+    query_counter = Counter(iter_content_tokens(query))
+    if not query_counter:
         return chunks[:top_k]
 
-    query_counter = Counter(query_tokens)
+    if chunk_index is None or len(chunk_index) != len(chunks):
+        chunk_index = _cached_chunk_index(tuple(chunks))
+
     ranked: list[tuple[float, str]] = []
 
-    for chunk in chunks:
-        chunk_tokens = [token for token in tokenize_words(chunk) if token not in STOPWORDS]
-        if not chunk_tokens:
+    for chunk, (chunk_counter, chunk_len) in zip(chunks, chunk_index):
+        if not chunk_counter:
             continue
-        chunk_counter = Counter(chunk_tokens)
-        overlap = set(query_counter) & set(chunk_counter)
-        lexical_score = sum(min(query_counter[token], chunk_counter[token]) for token in overlap)
-        length_penalty = 0.00015 * max(0, len(chunk) - 1100)
+        # Probe the larger counter while walking the smaller one; no
+        # intersection view or temporary key set is allocated per chunk.
+        if len(query_counter) <= len(chunk_counter):
+            smaller, larger = query_counter, chunk_counter
+        else:
+            smaller, larger = chunk_counter, query_counter
+        probe = larger.get
+        lexical_score = 0
+        for token, count in smaller.items():
+            other = probe(token)
+            if other is not None:
+                lexical_score += count if count < other else other
+        length_penalty = 0.00015 * max(0, chunk_len - 1100)
         score = lexical_score - length_penalty
         if score > 0:
             ranked.append((score, chunk))
@@ -203,7 +313,7 @@ def build_query_from_summary(summary: StructuredSummary) -> str:
 
 
 def _shorten(text: str, max_chars: int = 190) -> str:
-    value = re.sub(r"\s+", " ", (text or "")).strip()
+    value = _RE_WS.sub(" ", (text or "")).strip()
     if len(value) <= max_chars:
         return value
     return value[:max_chars].rsplit(" ", 1)[0] + "..."
@@ -218,8 +328,16 @@ def _ensure_item_range(items: list[str], label: str, min_items: int = 4, max_ite
     return normalized
 
 
+@lru_cache(maxsize=4)
+def _overview_source_stats(source_text: str) -> tuple[tuple[str, ...], Counter[str]]:
+    """Sentence list and token counts per source text, shared across the
+    validation retries that rebuild the overview for the same transcript."""
+    sentences = tuple(dedupe_strings(split_sentences(source_text)))
+    return sentences, Counter(iter_content_tokens(source_text))
+
+
 def build_three_paragraph_overview(source_text: str, concepts: list[str]) -> list[str]:
-    sentences = dedupe_strings(split_sentences(source_text))
+    sentences, token_counts = _overview_source_stats(source_text)
     concepts_clean = dedupe_strings(concepts)
 
     if not sentences:
@@ -239,14 +357,14 @@ def build_three_paragraph_overview(source_text: str, concepts: list[str]) -> lis
             ),
         ]
 
-    token_counts = Counter(token for token in tokenize_words(source_text) if token not in STOPWORDS)
-
-    def sentence_score(sentence: str) -> int:
-        tokens = set(token for token in tokenize_words(sentence) if token not in STOPWORDS)
-        return sum(token_counts.get(token, 0) for token in tokens)
+    # Score every sentence in one pass, then heap-select the top 15; the
+    # negated index keeps the original order on ties, matching a stable sort.
+    scored: list[tuple[int, int, str]] = []
+    for index, sentence in enumerate(sentences):
+        tokens = set(iter_content_tokens(sentence))
+        scored.append((sum(token_counts.get(token, 0) for token in tokens), -index, sentence))
 
-    ranked_sentences = sorted(sentences, key=sentence_score, reverse=True)
-    top_sentences = dedupe_strings(ranked_sentences[:15])
+    top_sentences = dedupe_strings(sentence for _, _, sentence in heapq.nlargest(15, scored))
 
     intro_pool = top_sentences[:6]
     deep_dive_pool = top_sentences[3:12]
@@ -329,12 +447,17 @@ def validate_structured_summary(summary: StructuredSummary, source_text: str) ->
         )
 
     validated.overview_paragraphs = dedupe_strings(validated.overview_paragraphs)
+    # Carry the lowercase keys across iterations instead of rebuilding the
+    # set from the paragraph list on every candidate.
+    seen_paragraphs = {item.lower() for item in validated.overview_paragraphs}
     while len(validated.overview_paragraphs) < 3:
         generated = build_three_paragraph_overview(source_text=source_text, concepts=validated.core_concepts)
         for paragraph in generated:
             if len(validated.overview_paragraphs) >= 3:
                 break
-            if paragraph.lower() not in {item.lower() for item in validated.overview_paragraphs}:
+            key = paragraph.lower()
+            if key not in seen_paragraphs:
+                seen_paragraphs.add(key)
                 validated.overview_paragraphs.append(paragraph)
 
     return validated
@@ -5,11 +5,62 @@ import json
 import re
 from dataclasses import dataclass
 from urllib.parse import parse_qs, urlparse
+from xml.etree import ElementTree
 
 import httpx
 from youtube_transcript_api import YouTubeTranscriptApi
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+_RE_CAPTION_TEXT = re.compile(r"<text[^>]*>(.*?)</text>", re.DOTALL)
+_RE_TAG = re.compile(r"<[^>]+>")
+
+_VTT_SKIP_PREFIXES = ("WEBVTT", "Kind:", "Language:")
+
+_RE_VIDEO_ID = re.compile(r"(?:v=|youtu\.be/|/shorts/|/embed/|/)([0-9A-Za-z_-]{11})(?:[?&/]|$)")
+
+_RE_META = re.compile(
+    r'<meta\b[^>]*?property=["\']([^"\']+)["\'][^>]*?content=["\']([^"\']+)["\']',
+    re.IGNORECASE,
+)
+_RE_TITLE = re.compile(r"<title>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+_PLAYER_RESPONSE_MARKERS = (
+    "ytInitialPlayerResponse = ",
+    "var ytInitialPlayerResponse = ",
+    "window['ytInitialPlayerResponse'] = ",
+)
+
+_WATCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+_async_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Shared keep-alive client: the oembed, watch-page, and caption fetches
+    of one extract reuse the same connections instead of paying a TLS
+    handshake per request."""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            timeout=20,
+            limits=httpx.Limits(max_keepalive_connections=8),
+        )
+    return _async_client
+
+
+async def close_client() -> None:
+    """Close the shared client; wired to the app shutdown hook."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
 @dataclass
 class TranscriptExtractionResult:
     video_id: str
@@ -31,6 +82,12 @@ class TranscriptService:
 
     @staticmethod
     def _extract_video_id(youtube_url: str) -> str:
+        # Canonical 11-character IDs match the precompiled pattern directly;
+        # urlparse only runs for URLs the fast path cannot place.
+        match = _RE_VIDEO_ID.search(youtube_url)
+        if match:
+            return match.group(1)
+
         parsed = urlparse(youtube_url)
         host = (parsed.hostname or "").lower()
 
@@ -49,18 +106,17 @@ class TranscriptService:
                 if len(parts) > 1:
                     return parts[1]
 
-        match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11})(?:[?&]|$)", youtube_url)
-        if match:
-            return match.group(1)
-
         raise ValueError("Invalid YouTube URL. Could not extract video ID.")
 
     @staticmethod
     def _clean_text(text: str) -> str:
+        # Most inputs (caption lines, JSON metadata fields) carry no markup,
+        # so probe for "<" before paying for the tag-strip regex; split/join
+        # collapses whitespace at C level.
         text = html.unescape(text)
-        text = re.sub(r"<[^>]+>", "", text)
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
+        if "<" in text:
+            text = _RE_TAG.sub("", text)
+        return " ".join(text.split())
 
     @staticmethod
     def _extract_with_library(video_id: str, language: str | None = None) -> str:
@@ -75,75 +131,40 @@ class TranscriptService:
         text = " ".join(chunk.get("text", "") for chunk in transcript)
         return TranscriptService._clean_text(text)
 
-    @staticmethod
-    def _extract_json_after_marker(content: str, marker: str) -> str | None:
-        marker_index = content.find(marker)
-        if marker_index == -1:
-            return None
-
-        start = content.find("{", marker_index)
-        if start == -1:
-            return None
-
-        depth = 0
-        in_string = False
-        escaped = False
-
-        for i in range(start, len(content)):
-            char = content[i]
-
-            if in_string:
-                if escaped:
-                    escaped = False
-                elif char == "\\":
-                    escaped = True
-                elif char == '"':
-                    in_string = False
-                continue
-
-            if char == '"':
-                in_string = True
-            elif char == "{":
-                depth += 1
-            elif char == "}":
-                depth -= 1
-                if depth == 0:
-                    return content[start : i + 1]
-
-        return None
-
     @staticmethod
     def _extract_player_response(html_content: str) -> dict | None:
-        markers = [
-            "ytInitialPlayerResponse = ",
-            "var ytInitialPlayerResponse = ",
-            "window['ytInitialPlayerResponse'] = ",
-        ]
-
-        for marker in markers:
-            payload = TranscriptService._extract_json_after_marker(html_content, marker)
-            if not payload:
+        # raw_decode does the brace/string matching inside the C _json module
+        # and hands back the parsed object directly, replacing the old
+        # character-by-character Python walk over the page.
+        for marker in _PLAYER_RESPONSE_MARKERS:
+            marker_index = html_content.find(marker)
+            if marker_index == -1:
+                continue
+            start = html_content.find("{", marker_index)
+            if start == -1:
                 continue
             try:
-                return json.loads(payload)
+                payload, _ = _JSON_DECODER.raw_decode(html_content, start)
             except json.JSONDecodeError:
                 continue
+            if isinstance(payload, dict):
+                return payload
 
         return None
 
     @staticmethod
-    def _extract_meta_tag(html_content: str, property_name: str) -> str:
-        pattern = rf'<meta[^>]+property=["\']{re.escape(property_name)}["\'][^>]+content=["\']([^"\']+)["\']'
-        match = re.search(pattern, html_content, flags=re.IGNORECASE)
-        return TranscriptService._clean_text(match.group(1)) if match else ""
+    def _parse_meta_tags(html_content: str) -> dict[str, str]:
+        """One scan over the page collecting property -> content for every
+        <meta> tag, instead of a fresh full-document search per property."""
+        return dict(_RE_META.findall(html_content))
 
     @staticmethod
-    def _extract_title_from_html(html_content: str) -> str:
-        title = TranscriptService._extract_meta_tag(html_content, "og:title")
+    def _extract_title_from_html(html_content: str, meta_tags: dict[str, str]) -> str:
+        title = TranscriptService._clean_text(meta_tags.get("og:title", ""))
         if title:
             return TranscriptService._normalize_title_candidate(title)
 
-        match = re.search(r"<title>(.*?)</title>", html_content, flags=re.IGNORECASE | re.DOTALL)
+        match = _RE_TITLE.search(html_content)
         if not match:
             return ""
 
@@ -181,7 +202,21 @@ class TranscriptService:
             merged["thumbnail_url"] = f"https://i.ytimg.com/vi/{merged['video_id']}/hqdefault.jpg"
         return merged
 
-    async def _fetch_video_meta(self, video_id: str) -> dict[str, str]:
+    async def _fetch_watch_html(self, video_id: str) -> str | None:
+        watch_url = f"https://www.youtube.com/watch?v={video_id}"
+        try:
+            watch_resp = await _get_client().get(watch_url, headers=_WATCH_HEADERS)
+            watch_resp.raise_for_status()
+            return watch_resp.text
+        except Exception:
+            return None
+
+    async def _fetch_video_meta(
+        self,
+        video_id: str,
+        html_content: str | None = None,
+        player_response: dict | None = None,
+    ) -> dict[str, str]:
         watch_url = f"https://www.youtube.com/watch?v={video_id}"
         default_meta = {
             "title": f"YouTube Lecture ({video_id})",
@@ -190,48 +225,43 @@ class TranscriptService:
             "description": "",
         }
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-            "Accept-Language": "en-US,en;q=0.9",
-        }
+        # Fast metadata path.
+        try:
+            oembed_resp = await _get_client().get(
+                "https://www.youtube.com/oembed",
+                params={"url": watch_url, "format": "json"},
+                headers=_WATCH_HEADERS,
+            )
+            if oembed_resp.is_success:
+                data = oembed_resp.json()
+                title = self._normalize_title_candidate(str(data.get("title", "")))
+                channel_title = self._clean_text(str(data.get("author_name", "")))
+                thumbnail_url = str(data.get("thumbnail_url", "")).strip()
+                if title:
+                    default_meta["title"] = title
+                if thumbnail_url:
+                    default_meta["thumbnail_url"] = thumbnail_url
+                if channel_title:
+                    default_meta["channel_title"] = channel_title
+        except Exception:
+            pass
 
-        async with httpx.AsyncClient(timeout=20) as client:
-            # Fast metadata path.
-            try:
-                oembed_resp = await client.get(
-                    "https://www.youtube.com/oembed",
-                    params={"url": watch_url, "format": "json"},
-                    headers=headers,
-                )
-                if oembed_resp.is_success:
-                    data = oembed_resp.json()
-                    title = self._normalize_title_candidate(str(data.get("title", "")))
-                    channel_title = self._clean_text(str(data.get("author_name", "")))
-                    thumbnail_url = str(data.get("thumbnail_url", "")).strip()
-                    if title:
-                        default_meta["title"] = title
-                    if thumbnail_url:
-                        default_meta["thumbnail_url"] = thumbnail_url
-                    if channel_title:
-                        default_meta["channel_title"] = channel_title
-            except Exception:
-                pass
-
-            # Rich metadata path from watch page.
-            try:
-                watch_resp = await client.get(watch_url, headers=headers)
-                watch_resp.raise_for_status()
-                html_content = watch_resp.text
-            except Exception:
-                return default_meta
+        # Rich metadata path from the watch page; callers that already hold
+        # the page pass it in so it is fetched and parsed only once.
+        if html_content is None:
+            html_content = await self._fetch_watch_html(video_id)
+        if html_content is None:
+            return default_meta
 
-        player_response = self._extract_player_response(html_content)
+        if player_response is None:
+            player_response = self._extract_player_response(html_content)
         player_meta = self._metadata_from_player_response(video_id, player_response)
         merged = self._merge_metadata(default_meta, player_meta)
 
-        html_title = self._extract_title_from_html(html_content)
-        html_thumbnail = self._extract_meta_tag(html_content, "og:image")
-        html_description = self._extract_meta_tag(html_content, "og:description")
+        meta_tags = self._parse_meta_tags(html_content)
+        html_title = self._extract_title_from_html(html_content, meta_tags)
+        html_thumbnail = self._clean_text(meta_tags.get("og:image", ""))
+        html_description = self._clean_text(meta_tags.get("og:description", ""))
 
         if html_title and merged.get("title", "").startswith("YouTube Lecture"):
             merged["title"] = html_title
@@ -267,7 +297,7 @@ class TranscriptService:
                 line = raw_line.strip()
                 if not line:
                     continue
-                if line.startswith("WEBVTT") or line.startswith("Kind:") or line.startswith("Language:"):
+                if line.startswith(_VTT_SKIP_PREFIXES):
                     continue
                 if "-->" in line:
                     continue
@@ -276,59 +306,63 @@ class TranscriptService:
                 lines.append(line)
             return TranscriptService._clean_text(" ".join(lines))
 
-        xml_chunks = re.findall(r"<text[^>]*>(.*?)</text>", caption_payload, flags=re.DOTALL)
-        if not xml_chunks:
+        # Proper XML parsing is linear-time in C; the old regex scan stays as
+        # a fallback for payloads that are not well-formed documents.
+        try:
+            root = ElementTree.fromstring(caption_payload)
+        except ElementTree.ParseError:
+            xml_chunks = _RE_CAPTION_TEXT.findall(caption_payload)
+            if not xml_chunks:
+                return ""
+            return TranscriptService._clean_text(" ".join(xml_chunks))
+
+        parts = [element.text for element in root.iter("text") if element.text]
+        if not parts:
             return ""
-
-        merged = " ".join(chunk for chunk in xml_chunks)
-        return TranscriptService._clean_text(merged)
+        return TranscriptService._clean_text(" ".join(parts))
 
     async def _extract_with_fallback(
         self,
         video_id: str,
         language: str | None = None,
+        player_response: dict | None = None,
     ) -> tuple[str, dict[str, str]]:
         watch_url = f"https://www.youtube.com/watch?v={video_id}"
+        client = _get_client()
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-            "Accept-Language": "en-US,en;q=0.9",
-        }
-
-        async with httpx.AsyncClient(timeout=20) as client:
-            watch_resp = await client.get(watch_url, headers=headers)
+        if player_response is None:
+            watch_resp = await client.get(watch_url, headers=_WATCH_HEADERS)
             watch_resp.raise_for_status()
-            html_content = watch_resp.text
+            player_response = self._extract_player_response(watch_resp.text)
 
-            player_response = self._extract_player_response(html_content)
-            metadata = self._metadata_from_player_response(video_id=video_id, player_response=player_response)
+        metadata = self._metadata_from_player_response(video_id=video_id, player_response=player_response)
 
-            if not player_response:
-                return "", metadata
+        if not player_response:
+            return "", metadata
 
-            caption_tracks = (
-                player_response.get("captions", {})
-                .get("playerCaptionsTracklistRenderer", {})
-                .get("captionTracks", [])
-            )
+        caption_tracks = (
+            player_response.get("captions", {})
+            .get("playerCaptionsTracklistRenderer", {})
+            .get("captionTracks", [])
+        )
 
-            selected_track = self._select_caption_track(caption_tracks, language)
-            if not selected_track:
-                return "", metadata
+        selected_track = self._select_caption_track(caption_tracks, language)
+        if not selected_track:
+            return "", metadata
 
-            base_url = selected_track.get("baseUrl")
-            if not base_url:
-                return "", metadata
+        base_url = selected_track.get("baseUrl")
+        if not base_url:
+            return "", metadata
 
-            caption_resp = await client.get(base_url + "&fmt=vtt")
-            caption_resp.raise_for_status()
-            transcript = self._parse_vtt_or_xml(caption_resp.text)
-            if transcript:
-                return transcript, metadata
+        caption_resp = await client.get(base_url + "&fmt=vtt")
+        caption_resp.raise_for_status()
+        transcript = self._parse_vtt_or_xml(caption_resp.text)
+        if transcript:
+            return transcript, metadata
 
-            xml_resp = await client.get(base_url)
-            xml_resp.raise_for_status()
-            return self._parse_vtt_or_xml(xml_resp.text), metadata
+        xml_resp = await client.get(base_url)
+        xml_resp.raise_for_status()
+        return self._parse_vtt_or_xml(xml_resp.text), metadata
 
     @staticmethod
     def _build_title_fallback_text(metadata: dict[str, str]) -> str:
@@ -360,14 +394,28 @@ class TranscriptService:
 
     async def extract(self, youtube_url: str, language: str | None = None) -> TranscriptExtractionResult:
         video_id = self._extract_video_id(youtube_url)
-        metadata = await self._fetch_video_meta(video_id)
+
+        # Fetch and parse the watch page once; both the metadata path and the
+        # caption fallback read the same player response.
+        html_content = await self._fetch_watch_html(video_id)
+        player_response = self._extract_player_response(html_content) if html_content else None
+
+        metadata = await self._fetch_video_meta(
+            video_id,
+            html_content=html_content,
+            player_response=player_response,
+        )
         metadata["video_id"] = video_id
 
         transcript = self._extract_with_library(video_id=video_id, language=language)
         used_title_fallback = False
 
         if not transcript:
-            fallback_transcript, fallback_meta = await self._extract_with_fallback(video_id=video_id, language=language)
+            fallback_transcript, fallback_meta = await self._extract_with_fallback(
+                video_id=video_id,
+                language=language,
+                player_response=player_response,
+            )
             metadata = self._merge_metadata(metadata, fallback_meta)
             transcript = fallback_transcript
 